@@ -8,14 +8,14 @@ import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
 
 try:
-    from rag.query import query_system
-    from rag.ingest import build_pipeline
+    from rag.query import stream_query_system
+    from rag.ingest import update_pipeline
     from vision.vision_processor import VisionProcessor
     from llama_index.core import StorageContext, load_index_from_storage
 except ImportError:
     # Fallback
-    from src.rag.query import query_system
-    from src.rag.ingest import build_pipeline
+    from src.rag.query import stream_query_system
+    from src.rag.ingest import update_pipeline
     from src.vision.vision_processor import VisionProcessor
     from llama_index.core import StorageContext, load_index_from_storage
 
@@ -109,14 +109,12 @@ with st.sidebar:
                 
                 try:
                     # Step A: Table Extraction
-                    progress_bar.progress(10, text="Detecting Tables (YOLOv8)...")
-                    vision = VisionProcessor(output_dir=table_output_dir)
-                    extracted_images = vision.process_pdf(pdf_path)
-                    
-                    st.success(f"👁️ Extracted {len(extracted_images)} tables")
+                    progress_bar.progress(10, text="Loading Table Detector (YOLOv8)...")
+                    # Keep previous crops: unchanged pages are not re-detected
+                    vision = VisionProcessor(output_dir=table_output_dir, clean=False)
                     
                     # Step B: Ingestion & Indexing
-                    progress_bar.progress(40, text="Analyzing Content (GPT-4o Vision)...")
+                    progress_bar.progress(40, text="Detecting Tables & Analyzing Content (GPT-4o Vision)...")
                     
                     # Create dedicated storage for this file
                     persist_dir = f"./storage/{file_name.split('.')[0]}"
@@ -124,10 +122,12 @@ with st.sidebar:
                     # Store PDF path for viewer
                     st.session_state.current_pdf_path = pdf_path
                     
-                    build_pipeline(
+                    # Re-uploads of an indexed file only re-process changed pages
+                    update_pipeline(
                         pdf_path=pdf_path,
                         table_output_dir=table_output_dir,
-                        persist_dir=persist_dir
+                        persist_dir=persist_dir,
+                        vision=vision
                     )
                     
                     progress_bar.progress(100, text="Ready!")
@@ -218,30 +218,29 @@ else:
                 
                 # Add Assistant Message
                 with st.chat_message("assistant"):
-                    with st.spinner("Analyzing..."):
-                        try:
-                            target_storage = st.session_state.get("persist_dir", "./storage")
-                            result = query_system(prompt, persist_dir=target_storage) 
-                            
-                            response_text = result.get("response_text", "No response.")
-                            source_images = result.get("source_images", [])
-                            
-                            st.markdown(response_text)
-                            
-                            if source_images:
-                                with st.expander("🔍 Verified Source Tables", expanded=True):
-                                    cols = st.columns(min(3, len(source_images)))
-                                    for idx, img_path in enumerate(source_images):
-                                        col = cols[idx % len(cols)]
-                                        if os.path.exists(img_path):
-                                            col.image(img_path, caption=os.path.basename(img_path))
-                                            
-                            st.session_state.messages.append({
-                                "role": "assistant",
-                                "content": response_text,
-                                "images": source_images
-                            })
-                            
-                        except Exception as e:
-                            st.error(f"Error: {e}")
+                    try:
+                        target_storage = st.session_state.get("persist_dir", "./storage")
+                        # Spinner covers retrieval only; the answer streams in token by token
+                        with st.spinner("Analyzing..."):
+                            result = stream_query_system(prompt, persist_dir=target_storage)
+                        
+                        response_text = st.write_stream(result["response_gen"]) or "No response."
+                        source_images = result.get("source_images", [])
+                        
+                        if source_images:
+                            with st.expander("🔍 Verified Source Tables", expanded=True):
+                                cols = st.columns(min(3, len(source_images)))
+                                for idx, img_path in enumerate(source_images):
+                                    col = cols[idx % len(cols)]
+                                    if os.path.exists(img_path):
+                                        col.image(img_path, caption=os.path.basename(img_path))
+                                        
+                        st.session_state.messages.append({
+                            "role": "assistant",
+                            "content": response_text,
+                            "images": source_images
+                        })
+                        
+                    except Exception as e:
+                        st.error(f"Error: {e}")
 
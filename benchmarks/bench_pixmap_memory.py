@@ -0,0 +1,83 @@
+"""
+Per-page memory profile of the pixmap -> detector-input hand-off.
+
+Old path: pix.samples -> Image.frombytes -> ultralytics' PIL branch
+(np.asarray, RGB->BGR flip, np.ascontiguousarray).
+New path: page_array() wraps the samples (or, in-process, the Pixmap
+buffer itself) as a BGR view, which ultralytics' ndarray branch passes
+through untouched.
+
+Both paths stop where ultralytics' letterbox/tensor build starts, since
+that part is identical. Allocations are measured with tracemalloc (NumPy
+and bytes objects are traced); Pillow's own image buffers bypass the
+Python allocator, so their size is added from the image dimensions.
+
+Usage:
+    python benchmarks/bench_pixmap_memory.py [--pdf data/apple_10k.pdf] [--max-side 640]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+# Ensure repo root in path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vision.render import page_array
+
+
+def old_path(pix):
+    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+    im = np.ascontiguousarray(np.asarray(img.convert("RGB"))[..., ::-1])
+    # Pillow stores RGB as 4 bytes/pixel outside tracemalloc's view
+    return im, img.width * img.height * 4
+
+
+def new_path_bytes(pix):
+    return page_array(pix.width, pix.height, pix.samples), 0
+
+
+def new_path_pixmap(pix):
+    return page_array(pix.width, pix.height, pix), 0
+
+
+def profile(doc, zoom_for, path):
+    """Returns (mean traced bytes allocated per page, mean untraced bytes per page)."""
+    traced, untraced = 0, 0
+    for page in doc:
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom_for(page), zoom_for(page)))
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        model_input, extra = path(pix)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        traced += peak
+        untraced += extra
+        del model_input
+    return traced / len(doc), untraced / len(doc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pixmap to model-input memory profile")
+    parser.add_argument("--pdf", default="data/apple_10k.pdf")
+    parser.add_argument("--max-side", type=int, default=640)
+    args = parser.parse_args()
+
+    with fitz.open(args.pdf) as doc:
+        zoom_for = lambda page: args.max_side / max(page.rect.width, page.rect.height)
+        print(f"{len(doc)} pages rendered at longer side {args.max_side}px\n")
+        print(f"{'path':<32} {'traced KB/page':>15} {'PIL KB/page':>12} {'total KB/page':>14}")
+        for name, path in [
+            ("old: frombytes + PIL branch", old_path),
+            ("new: page_array(samples)", new_path_bytes),
+            ("new: page_array(Pixmap)", new_path_pixmap),
+        ]:
+            traced, untraced = profile(doc, zoom_for, path)
+            print(f"{name:<32} {traced / 1024:>15.0f} {untraced / 1024:>12.0f} {(traced + untraced) / 1024:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Recall report for the text-layer table prefilter.
+
+Compares the pages the prefilter would send to YOLO against a full-detector
+run (every page detected). A page counts as a hit when the detector found a
+table on it and the prefilter kept it; table recall weights pages by their
+number of crops.
+
+The reference is either a fresh full run of VisionProcessor (needs the model
+weights and ultralytics) or an existing crops directory from such a run.
+
+Usage:
+    python benchmarks/bench_prefilter.py [--pdf data/apple_10k.pdf] [--threshold 5]
+    python benchmarks/bench_prefilter.py --reference-dir data/processed_tables
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import Counter
+import fitz  # PyMuPDF
+
+# Ensure repo root in path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.vision.prefilter import DEFAULT_THRESHOLD, score_page
+
+CROP_PATTERN = re.compile(r"^p(\d+)_table_\d+\.png$")
+
+
+def tables_per_page(crops_dir):
+    return Counter(
+        int(m.group(1)) for m in map(CROP_PATTERN.match, os.listdir(crops_dir)) if m
+    )
+
+
+def reference_run(pdf_path, model_path):
+    """Runs the detector on every page and returns {page: n_tables}."""
+    from src.vision.vision_processor import VisionProcessor
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        vision = VisionProcessor(model_path=model_path, output_dir=out_dir, prefilter=False)
+        start = time.perf_counter()
+        vision.process_pdf(pdf_path)
+        print(f"⏱️  Full detector run: {time.perf_counter() - start:.1f}s")
+        return tables_per_page(out_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Table prefilter recall report")
+    parser.add_argument("--pdf", default="data/apple_10k.pdf")
+    parser.add_argument("--model", default="models/table_detector.pt")
+    parser.add_argument("--reference-dir", help="Crops from an earlier full run (skips running YOLO)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--find-tables", action="store_true", help="Add PyMuPDF find_tables() to the score")
+    args = parser.parse_args()
+
+    reference = tables_per_page(args.reference_dir) if args.reference_dir else reference_run(args.pdf, args.model)
+
+    start = time.perf_counter()
+    with fitz.open(args.pdf) as doc:
+        scores = {i + 1: score_page(page, use_find_tables=args.find_tables) for i, page in enumerate(doc)}
+    score_s = time.perf_counter() - start
+
+    kept = {page for page, score in scores.items() if score >= args.threshold}
+    table_pages = set(reference)
+    missed = sorted(table_pages - kept)
+    total_tables = sum(reference.values())
+    kept_tables = sum(n for page, n in reference.items() if page in kept)
+
+    print(f"Pages:            {len(scores)}  (scored in {score_s * 1000:.0f} ms, "
+          f"{score_s / len(scores) * 1000:.1f} ms/page)")
+    print(f"Sent to detector: {len(kept)}  ({1 - len(kept) / len(scores):.0%} skipped)")
+    print(f"Page recall:      {len(table_pages & kept)}/{len(table_pages)}")
+    print(f"Table recall:     {kept_tables}/{total_tables}")
+    if missed:
+        print("Missed pages:     " + ", ".join(f"p{p} (score {scores[p]:.1f})" for p in missed))
+
+
+if __name__ == "__main__":
+    main()
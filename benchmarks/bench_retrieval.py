@@ -0,0 +1,87 @@
+"""
+Top-k retrieval benchmark: SimpleVectorStore's list-based similarity path
+vs. the NumPy MatrixSearchEngine used behind query_system, at 1k/10k/100k
+nodes by default.
+
+The baseline needs the embeddings as Python lists. One float object per
+value would take ~32 bytes, or ~5 GB at 100k x 1536, so vector components
+are drawn from a pool of POOL_SIZE values and the row lists share those
+float objects (~8 bytes per value). Both engines search the same values,
+and the baseline's list->array conversion and per-row loop cost the same.
+
+Usage:
+    python benchmarks/bench_retrieval.py [--sizes 1000 10000 100000] [--dim 1536]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+# Ensure repo root in path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llama_index.core.indices.query.embedding_utils import get_top_k_embeddings
+from src.rag.retrieval import MatrixSearchEngine
+
+
+POOL_SIZE = 4096
+
+
+def pooled_vectors(n, dim, rng):
+    """Returns (float32 matrix, matching list of row lists sharing pooled float objects)."""
+    pool = rng.standard_normal(POOL_SIZE, dtype=np.float32)
+    pool_objects = np.array(pool.astype(np.float64).tolist(), dtype=object)
+    codes = rng.integers(0, POOL_SIZE, (n, dim), dtype=np.int16)
+    return pool[codes], [pool_objects[row].tolist() for row in codes]
+
+
+def timed(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval top-k benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--top-k", type=int, default=15)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--max-baseline-floats", type=int, default=200_000_000,
+        help="Skip the list-based baseline above this many floats (it needs ~16 bytes per float)",
+    )
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'nodes':>8} {'baseline (ms)':>14} {'numpy (ms)':>11} {'speedup':>8}  same top-k")
+    for n in args.sizes:
+        ids = [f"node-{i}" for i in range(n)]
+        query = rng.standard_normal(args.dim, dtype=np.float32)
+        if n * args.dim > args.max_baseline_floats:
+            matrix, embeddings = rng.standard_normal((n, args.dim), dtype=np.float32), None
+        else:
+            matrix, embeddings = pooled_vectors(n, args.dim, rng)
+
+        engine = MatrixSearchEngine(ids, matrix)
+        fast_s, (fast_ids, _) = timed(lambda: engine.search(query, args.top_k), args.repeats)
+
+        if embeddings is None:
+            print(f"{n:>8} {'skipped':>14} {fast_s * 1000:>11.2f} {'-':>8}  -")
+            continue
+
+        # The current path: SimpleVectorStore keeps embeddings as Python lists
+        query_list = query.tolist()
+        slow_s, (_, slow_ids) = timed(
+            lambda: get_top_k_embeddings(query_list, embeddings, similarity_top_k=args.top_k, embedding_ids=ids),
+            max(1, args.repeats // 2),
+        )
+        print(f"{n:>8} {slow_s * 1000:>14.2f} {fast_s * 1000:>11.2f} {slow_s / fast_s:>7.1f}x  {list(slow_ids) == fast_ids}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Micro-benchmark for the two string-building hot paths on the query side:
+streaming answer deltas and building the retrieval context.
+
+Consumers that only need deltas (stream_query_system) iterate a
+StreamingCompletion and read `.text` once, which is linear. LlamaIndex's
+stream_complete must put the cumulative text on every CompletionResponse,
+so each chunk copies the text so far and that path stays quadratic; the
+benchmark drives the real OpenRouterLLM.stream_complete against the
+previous generator to check it is no slower.
+For context building CPython can often resize an unshared string in place,
+so `+=` is usually fine there; the list-join version is linear regardless.
+
+Usage:
+    python benchmarks/bench_streaming.py
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Ensure repo root in path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from llama_index.core.llms import CompletionResponse
+from llama_index.core.llms.callbacks import llm_completion_callback
+from src.rag.openrouter_client import OpenRouterLLM, StreamingCompletion
+
+
+def fake_chunks(n, delta="token "):
+    chunk = SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+    return [chunk] * n
+
+
+def old_stream(chunks):
+    # Previous stream_complete: cumulative text re-built on every chunk
+    text = ""
+    for chunk in chunks:
+        delta = chunk.choices[0].delta.content or ""
+        text += delta
+        yield text, delta
+
+
+class BenchLLM(OpenRouterLLM):
+    """OpenRouterLLM whose stream_text replays canned chunks instead of calling the API."""
+
+    def stream_text(self, prompt, **kwargs):
+        return StreamingCompletion(kwargs["chunks"])
+
+    @llm_completion_callback()
+    def old_stream_complete(self, prompt, **kwargs):
+        # Previous stream_complete (same callback wrapper, so only the body differs)
+        def gen():
+            text = ""
+            for chunk in kwargs["chunks"]:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                text += delta
+                yield CompletionResponse(text=text, delta=delta)
+        return gen()
+
+
+def consume_responses(responses):
+    last = None
+    for last in responses:
+        pass
+    return last.text
+
+
+def consume_old(chunks):
+    last = None
+    for last in old_stream(chunks):
+        pass
+    return last[0]
+
+
+def consume_new(chunks):
+    stream = StreamingCompletion(chunks)
+    for _ in stream:
+        pass
+    return stream.text
+
+
+def context_concat(texts):
+    context_str = ""
+    for i, text in enumerate(texts):
+        context_str += f"\n--- Source: Text (Page {i}) ---\n{text}\n"
+    return context_str
+
+
+def context_join(texts):
+    context_parts = []
+    for i, text in enumerate(texts):
+        context_parts.append(f"\n--- Source: Text (Page {i}) ---\n{text}\n")
+    return "".join(context_parts)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    print("Streaming answer deltas (chunks of 6 chars)")
+    print(f"{'chunks':>8} {'+= (ms)':>10} {'buffer (ms)':>12} {'ns/chunk +=':>12} {'ns/chunk buf':>13}")
+    for n in (1_000, 10_000, 50_000, 100_000):
+        chunks = fake_chunks(n)
+        old_s, old_text = timed(consume_old, chunks)
+        new_s, new_text = timed(consume_new, chunks)
+        assert old_text == new_text
+        print(f"{n:>8} {old_s * 1000:>10.1f} {new_s * 1000:>12.1f} {old_s / n * 1e9:>12.0f} {new_s / n * 1e9:>13.0f}")
+
+    print("\nstream_complete (CompletionResponse per chunk, cumulative text)")
+    print(f"{'chunks':>8} {'old (ms)':>10} {'new (ms)':>12} {'ns/chunk old':>12} {'ns/chunk new':>13}")
+    llm = BenchLLM(model="bench", api_key="bench")
+    for n in (1_000, 4_000, 10_000, 32_000):
+        chunks = fake_chunks(n)
+        old_s, old_text = timed(consume_responses, llm.old_stream_complete("", chunks=chunks))
+        new_s, new_text = timed(consume_responses, llm.stream_complete("", chunks=chunks))
+        assert old_text == new_text
+        print(f"{n:>8} {old_s * 1000:>10.1f} {new_s * 1000:>12.1f} {old_s / n * 1e9:>12.0f} {new_s / n * 1e9:>13.0f}")
+
+    print("\nContext building (node texts of ~4 KB)")
+    print(f"{'top_k':>8} {'+= (ms)':>10} {'join (ms)':>12}")
+    node_text = "x" * 4096
+    for k in (15, 100, 1_000, 10_000):
+        texts = [node_text] * k
+        old_s, old_ctx = timed(context_concat, texts)
+        new_s, new_ctx = timed(context_join, texts)
+        assert old_ctx == new_ctx
+        print(f"{k:>8} {old_s * 1000:>10.2f} {new_s * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,12 +37,15 @@ def run_query(question):
         return
 
     try:
-        from rag.query import query_system
-        result = query_system(question)
+        from rag.query import stream_query_system
+        result = stream_query_system(question)
         
         print("\n💬 Response:")
         print("-" * 50)
-        print(result["response_text"])
+        # Print tokens as they arrive
+        for delta in result["response_gen"]:
+            print(delta, end="", flush=True)
+        print()
         print("-" * 50)
         
         if result["source_images"]:
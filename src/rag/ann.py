@@ -0,0 +1,129 @@
+"""
+Inverted-file (IVF) approximate nearest neighbour index in pure NumPy.
+
+The rows of a normalised embedding matrix are clustered with spherical
+k-means into `nlist` lists. A query scores the centroids, then searches
+exactly only the rows of its `nprobe` best lists, so a search touches
+roughly nprobe / nlist of the matrix instead of all of it. Raising `nprobe`
+trades latency for recall (nprobe == nlist is exact search).
+
+The index only stores centroids and row numbers; the vectors themselves stay
+in the (memory-mapped) matrix of MemmapVectorStore.
+"""
+import os
+from typing import Optional, Tuple
+import numpy as np
+try:
+    from src.rag.retrieval import top_k
+except ImportError:
+    from retrieval import top_k
+
+# --- ANN Configuration ---
+# "ivf" builds an IVF index when a store is persisted; "exact" (default) keeps exhaustive search
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "exact").lower()
+# Below this many vectors exhaustive search is already fast, so no index is built
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "20000"))
+# Number of lists (0 = about sqrt(n)) and lists searched per query
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+
+# k-means settings: training uses a sample of this many rows per list
+TRAIN_ROWS_PER_LIST = 64
+TRAIN_ITERATIONS = 10
+# Rows scored against the centroids at a time while assigning
+ASSIGN_CHUNK = 65536
+
+
+def default_nlist(n: int) -> int:
+    return max(1, int(round(np.sqrt(n))))
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid (by dot product) for every row, in chunks to bound memory."""
+    labels = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], ASSIGN_CHUNK):
+        chunk = np.asarray(matrix[start:start + ASSIGN_CHUNK], dtype=np.float32)
+        labels[start:start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return labels
+
+
+def train_centroids(matrix: np.ndarray, nlist: int, iterations: int = TRAIN_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on a sample of the (normalised) rows; returns (nlist, dim) unit centroids."""
+    rng = np.random.default_rng(seed)
+    n = matrix.shape[0]
+    sample_size = min(n, nlist * TRAIN_ROWS_PER_LIST)
+    sample = np.sort(rng.choice(n, sample_size, replace=False))
+    sample = np.asarray(matrix[sample], dtype=np.float32)
+
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=nlist)
+        # Re-seed empty lists from random sample rows
+        empty = counts == 0
+        if empty.any():
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()), replace=False)]
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centroids = sums / norms
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Centroids plus the matrix's row numbers grouped by list: the rows of list
+    `i` are `order[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, centroids: np.ndarray, order: np.ndarray, offsets: np.ndarray, nprobe: int = IVF_NPROBE):
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.nprobe = nprobe
+
+    @property
+    def nlist(self) -> int:
+        return self.centroids.shape[0]
+
+    @property
+    def n_rows(self) -> int:
+        return self.order.shape[0]
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, nlist: Optional[int] = None, nprobe: int = IVF_NPROBE, seed: int = 0) -> "IVFIndex":
+        """Trains centroids on `matrix` (rows L2-normalised) and assigns every row to a list."""
+        n = matrix.shape[0]
+        nlist = min(n, nlist or default_nlist(n))
+        centroids = train_centroids(matrix, nlist, seed=seed)
+        labels = _assign(matrix, centroids)
+        order = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=nlist), out=offsets[1:])
+        return cls(centroids, order, offsets, nprobe=nprobe)
+
+    def search(self, matrix: np.ndarray, query: np.ndarray, k: int, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate top-k for a normalised `query` over `matrix` (the rows the
+        index was built from). Returns (row indices, scores), best first.
+        """
+        nprobe = min(self.nlist, nprobe or self.nprobe)
+        lists, _ = top_k(self.centroids, query, nprobe)
+        rows = np.concatenate([self.order[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+        # Ascending row numbers keep reads from a memory-mapped matrix sequential
+        rows.sort()
+        found, scores = top_k(np.asarray(matrix[rows], dtype=np.float32), query, k)
+        return rows[found], scores
+
+    def save(self, path: str) -> None:
+        # np.savez appends ".npz" to names without it, so write through a file object
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self.centroids, order=self.order, offsets=self.offsets)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, nprobe: int = IVF_NPROBE) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["order"], data["offsets"], nprobe=nprobe)
@@ -0,0 +1,97 @@
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+import numpy as np
+
+# Numbers in a question (years, amounts, percentages). Two questions that
+# differ only in their numbers ("net sales 2023" vs "2024") embed almost
+# identically, so cached answers are only reused when these match exactly.
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def _numbers(query: str) -> frozenset:
+    return frozenset(_NUMBER.findall(query))
+
+
+class AnswerCache:
+    """
+    Process-wide semantic cache of final answers.
+
+    Entries are keyed by an index key (persist_dir plus storage fingerprint,
+    so a re-ingest invalidates them) and the query embedding. A lookup returns
+    the most similar cached answer for the same index if its cosine similarity
+    is at least `threshold`, the questions mention the same numbers and the
+    entry is younger than `ttl` seconds. Least recently used entries are
+    evicted beyond `max_entries`.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 3600, max_entries: int = 512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # id -> (index_key, vector, numbers, answer, created)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, index_key: Hashable, query: str, query_embedding) -> Optional[dict]:
+        """Returns a copy of the cached answer dict for a near-duplicate query, or None."""
+        vector = self._normalize(query_embedding)
+        numbers = _numbers(query)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            candidates = [
+                (entry_id, entry) for entry_id, entry in self._entries.items()
+                if entry[0] == index_key and entry[2] == numbers
+            ]
+            if candidates:
+                scores = np.stack([entry[1] for _, entry in candidates]) @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id, entry = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return dict(entry[3])
+            self.misses += 1
+            return None
+
+    def store(self, index_key: Hashable, query: str, query_embedding, answer: dict) -> None:
+        vector = self._normalize(query_embedding)
+        with self._lock:
+            self._entries[self._next_id] = (index_key, vector, _numbers(query), dict(answer), time.time())
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _expire(self, now: float) -> None:
+        expired = [entry_id for entry_id, entry in self._entries.items() if now - entry[4] > self.ttl]
+        for entry_id in expired:
+            del self._entries[entry_id]
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+
+# Shared by the Streamlit app (all sessions) and the CLI; ANSWER_CACHE=0 disables it
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE", "1") == "1"
+answer_cache = AnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "512")),
+)
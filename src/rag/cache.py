@@ -0,0 +1,210 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+
+
+class SqliteCache:
+    """
+    Size-bounded key/value store in a single SQLite file.
+
+    Every read refreshes the entry's `last_used` timestamp; once the table grows
+    past `max_entries`, the least recently used rows are evicted. Hit/miss
+    counters are kept per process.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, last_used REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used)")
+        self._conn.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        found = self._fetch(keys)
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def _fetch(self, keys: List[str]) -> Dict[str, bytes]:
+        """Looks up `keys` and refreshes their `last_used`, without touching the counters."""
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM cache WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE cache SET last_used = ? WHERE key = ?", [(now, k) for k in found]
+                )
+                self._conn.commit()
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, items: Iterable[tuple]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, last_used) VALUES (?, ?, ?)",
+                [(key, value, now) for key, value in items],
+            )
+            self._evict()
+            self._conn.commit()
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many([(key, value)])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _evict(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+
+class EmbeddingCache(SqliteCache):
+    """
+    Content-addressed embedding cache keyed by (model_name, sha256 of the
+    normalised text). Vectors are stored as raw float32 bytes.
+    """
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{model_name}:{digest}"
+
+    def get_embeddings(self, model_name: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """Returns one entry per text: the cached vector, or None on a miss."""
+        keys = [self.key(model_name, text) for text in texts]
+        found = self.get_many(keys)
+        return [
+            np.frombuffer(found[k], dtype=np.float32).tolist() if k in found else None
+            for k in keys
+        ]
+
+    def set_embeddings(self, model_name: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        self.set_many(
+            (self.key(model_name, text), np.asarray(embedding, dtype=np.float32).tobytes())
+            for text, embedding in zip(texts, embeddings)
+        )
+
+
+class SummaryCache(SqliteCache):
+    """VLM table summaries keyed by (model, prompt, sha256 of the image bytes)."""
+
+    @staticmethod
+    def key(model: str, prompt: str, image_bytes: bytes) -> str:
+        digest = hashlib.sha256()
+        for part in (model.encode("utf-8"), prompt.encode("utf-8"), image_bytes):
+            digest.update(hashlib.sha256(part).digest())
+        return digest.hexdigest()
+
+    def get_summary(self, model: str, prompt: str, image_bytes: bytes) -> Optional[str]:
+        value = self.get(self.key(model, prompt, image_bytes))
+        return value.decode("utf-8") if value is not None else None
+
+    def get_summaries(self, model: str, prompts: List[str], images: List[bytes]) -> List[Optional[str]]:
+        """
+        One summary per image under the first of `prompts` that has one, or
+        None. Counts one hit or miss per image, however many prompts are tried.
+        """
+        keys = [[self.key(model, prompt, image) for prompt in prompts] for image in images]
+        found = self._fetch([k for image_keys in keys for k in image_keys])
+        summaries = []
+        for image_keys in keys:
+            value = next((found[k] for k in image_keys if k in found), None)
+            summaries.append(value.decode("utf-8") if value is not None else None)
+        with self._lock:
+            hits = sum(summary is not None for summary in summaries)
+            self.hits += hits
+            self.misses += len(summaries) - hits
+        return summaries
+
+    def set_summary(self, model: str, prompt: str, image_bytes: bytes, summary: str) -> None:
+        self.set(self.key(model, prompt, image_bytes), summary.encode("utf-8"))
+
+
+class QueryEmbeddingCache:
+    """
+    In-process LRU of query embeddings keyed by (model_name, normalised query
+    text), optionally backed by an EmbeddingCache file so entries survive
+    restarts. Normalisation only collapses whitespace, so a hit is always the
+    embedding of the exact text the API would have been sent.
+    """
+
+    def __init__(self, max_entries: int = 1024, disk: Optional[EmbeddingCache] = None):
+        self.max_entries = max_entries
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (model_name, query) -> embedding
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.split())
+
+    def get(self, model_name: str, query: str) -> Optional[List[float]]:
+        key = (model_name, self.normalize(query))
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+        if self.disk is not None:
+            embedding = self.disk.get_embeddings(model_name, [key[1]])[0]
+            if embedding is not None:
+                self._remember(key, embedding)
+                with self._lock:
+                    self.hits += 1
+                return embedding
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, model_name: str, query: str, embedding: List[float]) -> None:
+        key = (model_name, self.normalize(query))
+        self._remember(key, list(embedding))
+        if self.disk is not None:
+            self.disk.set_embeddings(model_name, [key[1]], [embedding])
+
+    def _remember(self, key: tuple, embedding: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,166 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# --- Adaptive Concurrency Configuration ---
+MIN_CONCURRENCY = int(os.getenv("OPENROUTER_MIN_CONCURRENCY", "1"))
+INITIAL_CONCURRENCY = int(os.getenv("OPENROUTER_INITIAL_CONCURRENCY", "4"))
+MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "32"))
+MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "6"))
+
+# A call is "healthy" while its latency stays within this factor of the best
+# recent latency for the same kind of call; only healthy calls grow the limit.
+LATENCY_TOLERANCE = 2.0
+# Multiplicative decrease on 429/5xx, at most once per cooldown (>= 1s)
+BACKOFF_FACTOR = 0.5
+# Jittered exponential retry delays (seconds)
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30.0
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    return getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """429s, 5xx responses, timeouts and dropped connections are worth retrying."""
+    status = _status_code(exc)
+    if status is not None:
+        return status == 429 or status >= 500
+    # openai.APIConnectionError / APITimeoutError carry no status code
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def retry_delay(attempt: int, exc: BaseException) -> float:
+    """Honours Retry-After when the server sends one, else full-jitter exponential backoff."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(RETRY_MAX_DELAY, float(retry_after)) + random.uniform(0, RETRY_BASE_DELAY)
+        except ValueError:
+            pass
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit shared by every thread (and event loop) calling the
+    same endpoint.
+
+    Each healthy success adds 1/limit (about +1 per round trip of the whole
+    window); a 429/5xx halves the limit and pauses growth for a cooldown, so
+    a burst of rejections from one window counts once. Failed calls are
+    retried with jittered backoff. Callers should disable their client's own
+    retries so that rate-limit responses reach the limiter.
+    """
+
+    def __init__(
+        self,
+        initial: int = INITIAL_CONCURRENCY,
+        min_limit: int = MIN_CONCURRENCY,
+        max_limit: int = MAX_CONCURRENCY,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.successes = 0
+        self.throttled = 0
+        self._best_latency: Dict[str, float] = {}
+        self._cooldown_until = 0.0
+        self._cond = threading.Condition()
+
+    # --- Slots ---
+
+    def _try_acquire(self) -> bool:
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def _acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def _aacquire(self) -> None:
+        # Slots are shared with threads, so poll instead of awaiting a loop-bound primitive
+        while not self._try_acquire():
+            await asyncio.sleep(0.02)
+
+    def _release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    # --- Feedback ---
+
+    def _on_success(self, kind: str, latency: float) -> None:
+        with self._cond:
+            self.successes += 1
+            best = self._best_latency.get(kind)
+            # Best latency drifts up slowly so one lucky call doesn't pin it forever
+            best = latency if best is None or latency < best else best + 0.01 * (latency - best)
+            self._best_latency[kind] = best
+            # No growth while recovering from a decrease
+            if latency <= LATENCY_TOLERANCE * best and time.monotonic() >= self._cooldown_until:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self._cond.notify_all()
+
+    def _on_overload(self, latency: float) -> None:
+        with self._cond:
+            self.throttled += 1
+            now = time.monotonic()
+            if now >= self._cooldown_until:
+                self.limit = max(self.min_limit, self.limit * BACKOFF_FACTOR)
+                self._cooldown_until = now + max(latency, 1.0)
+
+    # --- Calls ---
+
+    def call(self, fn: Callable[[], Any], kind: str = "default") -> Any:
+        """Runs `fn()` inside a slot, retrying retryable failures with jittered backoff."""
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            start = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                self._on_overload(time.monotonic() - start)
+                delay = retry_delay(attempt, e)
+            else:
+                self._on_success(kind, time.monotonic() - start)
+                return result
+            finally:
+                # Also on cancellation/KeyboardInterrupt (BaseException), or the slot leaks
+                self._release()
+            time.sleep(delay)
+
+    async def acall(self, fn: Callable[[], Any], kind: str = "default") -> Any:
+        """Async twin of `call`; `fn()` must return an awaitable."""
+        for attempt in range(self.max_retries + 1):
+            await self._aacquire()
+            start = time.monotonic()
+            try:
+                result = await fn()
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                self._on_overload(time.monotonic() - start)
+                delay = retry_delay(attempt, e)
+            else:
+                self._on_success(kind, time.monotonic() - start)
+                return result
+            finally:
+                # Also on cancellation/KeyboardInterrupt (BaseException), or the slot leaks
+                self._release()
+            await asyncio.sleep(delay)
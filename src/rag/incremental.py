@@ -0,0 +1,116 @@
+import os
+import re
+import glob
+import json
+import hashlib
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import fitz  # PyMuPDF
+
+MANIFEST_FNAME = "page_manifest.json"
+# Table crops are written as p{page}_table_{n}.png (see VisionProcessor)
+CROP_PATTERN = re.compile(r"^p(\d+)_table_(\d+)\.png$")
+
+
+def fingerprint_pages(pdf_path: str, raster_zoom: float = 0.5) -> Dict[int, str]:
+    """
+    Fingerprints every page (1-based) by hashing its text layer and a
+    low-resolution raster, so both text edits and visual changes to tables
+    or charts are detected.
+    """
+    fingerprints = {}
+    with fitz.open(pdf_path) as doc:
+        for page_index, page in enumerate(doc):
+            digest = hashlib.sha256()
+            digest.update(page.get_text("text").encode("utf-8"))
+            pix = page.get_pixmap(matrix=fitz.Matrix(raster_zoom, raster_zoom))
+            digest.update(pix.samples)
+            fingerprints[page_index + 1] = digest.hexdigest()
+    return fingerprints
+
+
+def load_manifest(persist_dir: str) -> Optional[dict]:
+    """
+    Returns the manifest written by the last ingest, or None:
+    {"pdf_path": ..., "pages": {"<page>": {"fingerprint": ..., "node_ids": [...]}}}
+    """
+    path = os.path.join(persist_dir, MANIFEST_FNAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(persist_dir: str, pdf_path: str, fingerprints: Dict[int, str], page_nodes: Dict[int, List[str]]):
+    manifest = {
+        "pdf_path": pdf_path,
+        "pages": {
+            str(page): {"fingerprint": fingerprint, "node_ids": page_nodes.get(page, [])}
+            for page, fingerprint in fingerprints.items()
+        },
+    }
+    os.makedirs(persist_dir, exist_ok=True)
+    with open(os.path.join(persist_dir, MANIFEST_FNAME), "w") as f:
+        json.dump(manifest, f)
+
+
+def diff_pages(manifest: dict, fingerprints: Dict[int, str]) -> Tuple[List[int], List[int], List[int], Dict[int, int]]:
+    """
+    Matches pages by fingerprint rather than position, so inserting or
+    deleting a page doesn't dirty every page after it.
+
+    Returns (added, changed, removed, moved): `added`/`changed` are new page
+    numbers whose content did not exist before (`changed` when the old page
+    at that position is gone too), `removed` are old page numbers whose
+    content no longer exists, and `moved` maps old -> new page number for
+    identical pages at a new position.
+    """
+    old = {int(page): entry["fingerprint"] for page, entry in manifest["pages"].items()}
+    # Pages that kept their position match first, so duplicates (e.g. blank
+    # pages) don't shuffle; the rest match in page order.
+    unmatched_old = defaultdict(list)  # fingerprint -> old pages
+    for page in sorted(old):
+        if fingerprints.get(page) != old[page]:
+            unmatched_old[old[page]].append(page)
+
+    moved, unmatched_new = {}, []
+    for page in sorted(fingerprints):
+        fingerprint = fingerprints[page]
+        if old.get(page) == fingerprint:
+            continue
+        if unmatched_old.get(fingerprint):
+            moved[unmatched_old[fingerprint].pop(0)] = page
+        else:
+            unmatched_new.append(page)
+
+    stale = {page for pages in unmatched_old.values() for page in pages}
+    added = [page for page in unmatched_new if page not in stale]
+    changed = [page for page in unmatched_new if page in stale]
+    removed = sorted(stale.difference(changed))
+    return added, changed, removed, moved
+
+
+def move_page_tables(crops_dir: str, moved: Dict[int, int]) -> Dict[str, str]:
+    """
+    Renames the crops of moved pages to their new page numbers (via temporary
+    names, since pages can swap places). Leftover crops already at a target
+    page belong to content that no longer exists and are deleted.
+    Returns the number of crops renamed.
+    """
+    staged = []
+    for old_page, new_page in moved.items():
+        for path in glob.glob(os.path.join(crops_dir, f"p{old_page}_table_*.png")):
+            match = CROP_PATTERN.match(os.path.basename(path))
+            if not match:
+                continue
+            target = os.path.join(crops_dir, f"p{new_page}_table_{match.group(2)}.png")
+            os.replace(path, path + ".moving")
+            staged.append((path, target))
+
+    for new_page in moved.values():
+        for path in glob.glob(os.path.join(crops_dir, f"p{new_page}_table_*.png")):
+            os.remove(path)
+
+    for path, target in staged:
+        os.replace(path + ".moving", target)
+    return len(staged)
@@ -0,0 +1,121 @@
+import os
+import threading
+from collections import OrderedDict
+from llama_index.core import load_index_from_storage
+try:
+    from src.rag.vector_store import load_storage_context
+except ImportError:
+    from vector_store import load_storage_context
+
+
+def storage_fingerprint(persist_dir: str) -> tuple:
+    """
+    Cheap fingerprint of a persisted index: (file name, size, mtime) for every
+    file in the storage directory. Any re-ingest rewrites these files, so a
+    changed fingerprint means the cached index is stale.
+    """
+    entries = []
+    with os.scandir(persist_dir) as it:
+        for entry in it:
+            if entry.is_file():
+                stat = entry.stat()
+                entries.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(entries))
+
+
+def load_index(persist_dir: str):
+    """Loads a VectorStoreIndex from disk (uncached)."""
+    storage_context = load_storage_context(persist_dir)
+    return load_index_from_storage(storage_context)
+
+
+class IndexCache:
+    """
+    Process-wide, thread-safe LRU cache of loaded indexes.
+
+    Entries are keyed by the absolute `persist_dir` and validated against the
+    storage fingerprint on every lookup, so a re-ingested document is reloaded
+    automatically. Eviction happens when either `max_entries` or `max_bytes`
+    (measured as the on-disk size of the storage files) is exceeded.
+    """
+
+    def __init__(self, max_entries: int = 8, max_bytes: int = 1024 * 1024 * 1024, loader=load_index):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._loader = loader
+        self._entries = OrderedDict()  # key -> (fingerprint, index, size)
+        self._key_locks = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, persist_dir: str):
+        """Returns the loaded index for `persist_dir`, loading it at most once per fingerprint."""
+        key = os.path.abspath(persist_dir)
+        fingerprint = storage_fingerprint(key)
+
+        with self._lock:
+            cached = self._lookup(key, fingerprint)
+            if cached is not None:
+                return cached
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside the global lock so other documents stay servable,
+        # but only once per key even if several sessions ask concurrently.
+        with key_lock:
+            with self._lock:
+                cached = self._lookup(key, fingerprint)
+                if cached is not None:
+                    return cached
+                self.misses += 1
+
+            index = self._loader(key)
+            size = sum(entry[1] for entry in fingerprint)
+
+            with self._lock:
+                self._entries[key] = (fingerprint, index, size)
+                self._entries.move_to_end(key)
+                self._evict()
+            return index
+
+    def invalidate(self, persist_dir: str = None):
+        """Drops one entry (or everything when `persist_dir` is None)."""
+        with self._lock:
+            if persist_dir is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(persist_dir), None)
+
+    def fingerprint(self, persist_dir: str) -> tuple:
+        return storage_fingerprint(os.path.abspath(persist_dir))
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return sum(size for _, _, size in self._entries.values())
+
+    def _lookup(self, key, fingerprint):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] != fingerprint:
+            # Storage changed on disk since we loaded it
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def _evict(self):
+        total = sum(size for _, _, size in self._entries.values())
+        # Always keep the most recently used entry, even if it alone exceeds the cap
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            total -= size
+
+
+# Shared by the Streamlit app (all sessions) and the CLI
+index_cache = IndexCache(
+    max_entries=int(os.getenv("INDEX_CACHE_MAX_ENTRIES", "8")),
+    max_bytes=int(os.getenv("INDEX_CACHE_MAX_MB", "1024")) * 1024 * 1024,
+)
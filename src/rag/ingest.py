@@ -1,19 +1,38 @@
 import os
+import re
+import io
+import json
 import glob
+from typing import Optional
+from itertools import islice
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
 from llama_index.core import (
     Settings,
     VectorStoreIndex,
-    SimpleDirectoryReader,
     StorageContext,
     Document,
 )
 from llama_index.core.node_parser import SentenceSplitter
 try:
     from src.rag.openrouter_client import OpenRouterLLM, OpenRouterEmbedding
+    from src.rag.vector_store import MemmapVectorStore
+    from src.rag.cache import SummaryCache
+    from src.rag.concurrency import MAX_CONCURRENCY
+    from src.rag.vlm_images import to_data_url
+    from src.rag.index_cache import load_index
+    from src.rag.incremental import CROP_PATTERN, fingerprint_pages, load_manifest, save_manifest, diff_pages, move_page_tables
 except ImportError:
     from openrouter_client import OpenRouterLLM, OpenRouterEmbedding
-from llama_index.core.schema import TextNode
+    from vector_store import MemmapVectorStore
+    from cache import SummaryCache
+    from concurrency import MAX_CONCURRENCY
+    from vlm_images import to_data_url
+    from index_cache import load_index
+    from incremental import CROP_PATTERN, fingerprint_pages, load_manifest, save_manifest, diff_pages, move_page_tables
+from llama_index.core.schema import MetadataMode, TextNode
 
 # Load environment variables
 load_dotenv()
@@ -29,9 +48,11 @@ llm = OpenRouterLLM(
 )
 
 # Initialize Embeddings (OpenRouter)
+# Chunk embeddings are cached on disk, so re-ingests only pay for new text
 embed_model = OpenRouterEmbedding(
     model_name="openai/text-embedding-3-small", 
     api_key=OPENROUTER_API_KEY,
+    cache_path=os.getenv("EMBEDDING_CACHE_PATH", "./cache/embeddings.sqlite"),
 )
 
 # Set Global Settings
@@ -40,34 +61,63 @@ Settings.embed_model = embed_model
 Settings.chunk_size = 1024
 Settings.chunk_overlap = 20
 
-def summarize_table_image(image_path: str) -> str:
+TABLE_SUMMARY_PROMPT = (
+    "Analyze this image of a financial table. "
+    "Output a comprehensive text summary of the data it contains, "
+    "including column headers and key row values, so that it can be retrieved via search. "
+    "Do not include Markdown formatting like ```json or ```text, just the clean summary."
+)
+
+TABLE_BATCH_PROMPT = (
+    "Analyze each of the {count} images of financial tables below, in order. "
+    "For each one, write a comprehensive text summary of the data it contains, "
+    "including column headers and key row values, so that it can be retrieved via search. "
+    "Respond with only a JSON array of {count} strings, the i-th string summarising the i-th image."
+)
+
+# Small crops from the same page share one VLM request, up to this many per
+# request (1 = one request per table). Crops larger than SMALL_TABLE_PIXELS
+# are always summarised on their own.
+TABLES_PER_REQUEST = int(os.getenv("VLM_TABLES_PER_REQUEST", "1"))
+SMALL_TABLE_PIXELS = int(os.getenv("VLM_SMALL_TABLE_PIXELS", str(1024 * 512)))
+
+# Nodes embedded and appended to the index per batch. Pages are read lazily,
+# so peak memory is one batch plus the docstore (node texts stay in memory
+# until persist) instead of the whole document.
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+# Crops written by VisionProcessor: p{page}_table_{n}.png
+TABLE_FILE_PATTERN = re.compile(r"^p(\d+)_table_\d+\.png$")
+
+# VLM summaries keyed by image hash + prompt + model: identical tables are only summarised once
+summary_cache = SummaryCache(os.getenv("SUMMARY_CACHE_PATH", "./cache/table_summaries.sqlite"))
+
+def summarize_table_image(image_path: str, image_bytes: Optional[bytes] = None) -> str:
     """
     Sends table image to VLM to get a text summary.
+    Pass `image_bytes` (the PNG written to `image_path`) to skip re-reading it.
     """
-    import base64
-    
-    with open(image_path, "rb") as image_file:
-        base64_image = base64.b64encode(image_file.read()).decode("utf-8")
-        
-    # Construct Multimodal Message for OpenRouter/OpenAI-compatible
-    # Note: LlamaIndex OpenAI class supports passing `image_url` in messages
-    
+    if image_bytes is None:
+        with open(image_path, "rb") as image_file:
+            image_bytes = image_file.read()
+
+    # Cached by the original crop bytes, independent of the upload encoding
+    cached = summary_cache.get_summary(llm.model, TABLE_SUMMARY_PROMPT, image_bytes)
+    if cached is not None:
+        return cached
+    return _summarize_uncached(image_path, image_bytes)
+
+def _summarize_uncached(image_path, image_bytes):
+    """One VLM request for one crop (already known to be a cache miss); caches the result."""
     from llama_index.core.llms import ChatMessage, MessageRole, ImageBlock, TextBlock
 
-    # Create content blocks
+    # Downscaled/re-encoded for the VLM (see vlm_images), as a data URL
     image_block = ImageBlock(
-        url=f"data:image/png;base64,{base64_image}",
+        url=to_data_url(image_bytes),
         detail="high"  # Optional, for OpenAI
     )
     
-    prompt_text = (
-        "Analyze this image of a financial table. "
-        "Output a comprehensive text summary of the data it contains, "
-        "including column headers and key row values, so that it can be retrieved via search. "
-        "Do not include Markdown formatting like ```json or ```text, just the clean summary."
-    )
-    
-    text_block = TextBlock(text=prompt_text)
+    text_block = TextBlock(text=TABLE_SUMMARY_PROMPT)
     
     # Send request
     try:
@@ -79,100 +129,472 @@ def summarize_table_image(image_path: str) -> str:
                 )
             ]
         )
-        return response.message.content
+        summary = response.message.content
     except Exception as e:
         print(f"Error summarising {image_path}: {e}")
         return f"Error processing table: {os.path.basename(image_path)}"
 
-def build_pipeline(pdf_path, table_output_dir, persist_dir="./storage"):
+    if summary:
+        summary_cache.set_summary(llm.model, TABLE_SUMMARY_PROMPT, image_bytes, summary)
+    return summary
+
+def _parse_summaries(content, count):
+    """Extracts a JSON array of `count` strings from a VLM reply, or None."""
+    if not content:
+        return None
+    start, end = content.find("["), content.rfind("]")
+    if start == -1 or end <= start:
+        return None
+    try:
+        summaries = json.loads(content[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(summaries, list) or len(summaries) != count:
+        return None
+    if not all(isinstance(summary, str) and summary.strip() for summary in summaries):
+        return None
+    return summaries
+
+def summarize_table_images(items):
+    """
+    Summarises several crops, given as (image_path, image_bytes or None), in a
+    single VLM request and returns one summary per item, in order.
+
+    Cache lookups are per table and only the misses are sent. Batched
+    summaries are cached under TABLE_BATCH_PROMPT; lookups here also accept a
+    single-table summary, but summarize_table_image never returns a batched one.
+    Falls back to one request per table if the reply is not a JSON array of
+    the right length.
+    """
+    from llama_index.core.llms import ChatMessage, MessageRole, ImageBlock, TextBlock
+
+    loaded = []
+    for path, data in items:
+        if data is None:
+            with open(path, "rb") as image_file:
+                data = image_file.read()
+        loaded.append((path, data))
+    items = loaded
+    summaries = summary_cache.get_summaries(
+        llm.model, [TABLE_SUMMARY_PROMPT, TABLE_BATCH_PROMPT], [data for _, data in items]
+    )
+    missing = [i for i, summary in enumerate(summaries) if summary is None]
+    if len(missing) <= 1:
+        for i in missing:
+            summaries[i] = _summarize_uncached(*items[i])
+        return summaries
+
+    blocks = [TextBlock(text=TABLE_BATCH_PROMPT.format(count=len(missing)))]
+    for n, i in enumerate(missing, start=1):
+        blocks.append(TextBlock(text=f"Image {n}:"))
+        blocks.append(ImageBlock(url=to_data_url(items[i][1]), detail="high"))
+
+    try:
+        response = llm.chat(messages=[ChatMessage(role=MessageRole.USER, blocks=blocks)])
+        batch = _parse_summaries(response.message.content, len(missing))
+    except Exception as e:
+        print(f"Error summarising {len(missing)} tables together: {e}")
+        batch = None
+
+    if batch is None:
+        for i in missing:
+            summaries[i] = _summarize_uncached(*items[i])
+        return summaries
+
+    for i, summary in zip(missing, batch):
+        summaries[i] = summary
+        summary_cache.set_summary(llm.model, TABLE_BATCH_PROMPT, items[i][1], summary)
+    return summaries
+
+def _table_page(img_path):
+    """Page number encoded in a crop filename (`p{page}_table_{n}.png`), or None."""
+    match = TABLE_FILE_PATTERN.match(os.path.basename(img_path))
+    return int(match.group(1)) if match else None
+
+def _iter_page_documents(pdf_path, pages=None):
+    """
+    Lazily yields one Document per PDF page, optionally restricted to some
+    (1-based) pages. Text and metadata match what SimpleDirectoryReader +
+    PDFReader produce, so embedding-cache keys carry over, but only the
+    current page is held in memory.
+    """
+    import pypdf
+    from llama_index.core.readers.file.base import default_file_metadata_func
+
+    file_metadata = default_file_metadata_func(pdf_path)
+    excluded_keys = ["file_name", "file_type", "file_size", "creation_date", "last_modified_date", "last_accessed_date"]
+    pages = set(pages) if pages is not None else None
+
+    with open(pdf_path, "rb") as fp:
+        pdf = pypdf.PdfReader(fp)
+        for page_index, page in enumerate(pdf.pages):
+            page_num = page_index + 1
+            if pages is not None and page_num not in pages:
+                continue
+            # page_label may be a printed label ("ii", "A-1"), so also record
+            # the physical page number, hidden from the embedding and LLM text.
+            metadata = {"page_label": pdf.page_labels[page_index], "file_name": os.path.basename(pdf_path)}
+            metadata.update(file_metadata)
+            metadata["page_num"] = page_num
+            yield Document(
+                text=page.extract_text(),
+                metadata=metadata,
+                excluded_embed_metadata_keys=excluded_keys + ["page_num"],
+                excluded_llm_metadata_keys=excluded_keys + ["page_num"],
+            )
+
+def _iter_text_nodes(pdf_path, pages=None):
+    """Chunks the PDF text page by page, as the pages are read."""
+    splitter = SentenceSplitter(chunk_size=1024, chunk_overlap=200)
+    for doc in _iter_page_documents(pdf_path, pages):
+        yield from splitter.get_nodes_from_documents([doc])
+
+def _table_nodes(items):
+    """
+    Table path of the ingest DAG, run on the VLM workers: summarises a group of
+    crops, given as (image_path, image_bytes or None), and embeds the summaries
+    right away, so the nodes arrive ready to insert.
     """
+    try:
+        if len(items) == 1:
+            summaries = [summarize_table_image(*items[0])]
+        else:
+            summaries = summarize_table_images(items)
+        nodes = []
+        for (img_path, _), summary in zip(items, summaries):
+            if not summary:
+                continue
+            node = TextNode(text=summary)
+            node.metadata = {
+                "image_path": img_path,
+                "file_name": os.path.basename(img_path),
+                "type": "table_image",
+                "page_num": _table_page(img_path) or "unknown"
+            }
+            nodes.append(node)
+        if nodes:
+            embeddings = embed_model.get_text_embedding_batch(
+                [node.get_content(metadata_mode=MetadataMode.EMBED) for node in nodes]
+            )
+            for node, embedding in zip(nodes, embeddings):
+                node.embedding = embedding
+        return nodes
+    except Exception as e:
+        print(f"Error processing {', '.join(path for path, _ in items)}: {e}")
+        return []
+
+class _TableBatcher:
+    """
+    Groups small crops of the same page into VLM requests of up to
+    TABLES_PER_REQUEST tables; large crops are submitted on their own.
+    Crops arrive page by page, so a page's group is flushed as soon as a crop
+    from another page shows up (or when it is full, or on `flush()`).
+    """
+
+    def __init__(self, submit, size=None):
+        self._submit = submit
+        self._size = size or TABLES_PER_REQUEST
+        self._groups = {}
+        self._lock = threading.Lock()
+
+    def add(self, img_path, image_bytes=None):
+        item = (img_path, image_bytes)
+        if self._size <= 1 or not self._is_small(item):
+            self._submit([item])
+            return
+        page = _table_page(img_path)
+        with self._lock:
+            ready = [self._groups.pop(p) for p in list(self._groups) if p != page]
+            group = self._groups.setdefault(page, [])
+            group.append(item)
+            if len(group) >= self._size:
+                ready.append(self._groups.pop(page))
+        for group in ready:
+            self._submit(group)
+
+    def flush(self):
+        with self._lock:
+            ready = list(self._groups.values())
+            self._groups.clear()
+        for group in ready:
+            self._submit(group)
+
+    @staticmethod
+    def _is_small(item):
+        from PIL import Image
+
+        img_path, image_bytes = item
+        source = io.BytesIO(image_bytes) if image_bytes is not None else img_path
+        with Image.open(source) as img:
+            width, height = img.size
+        return width * height <= SMALL_TABLE_PIXELS
+
+def _run_ingest_dag(index, text_nodes, image_files=(), detect_tables=None, batch_size=None):
+    """
+    Ingest scheduler. Independent paths run concurrently:
+      vision: render -> YOLO -> crop                            (vision thread)
+      tables: crop(s) -> VLM summary -> embed                   (thread pool, AIMD-limited)
+      text:   pages -> chunks -> embed (batched) -> insert      (this thread)
+    Crops are queued for summarisation as soon as they are written, and each
+    finished (already embedded) table node is inserted at the next batch
+    boundary, so wall time approaches the slowest path instead of the sum.
+    The index itself is only touched from this thread.
+
+    `image_files` are crops that already exist. `detect_tables`, if given, is
+    called with an `on_table(path, png_bytes)` callback (e.g. `VisionProcessor.process_pdf`
+    bound to a PDF) and runs on the vision thread.
+
+    `text_nodes` is consumed lazily, so pages are only read once the previous
+    batch has been embedded (natural backpressure).
+    Returns ({page: [node_ids]}, text_count, table_count).
+    """
+    batch_size = batch_size or INGEST_BATCH_SIZE
+    page_nodes = {}
+    counts = {"text": 0, "table": 0}
+    submitted = queue.Queue()
+    vision_errors = []
+
+    def insert(nodes, kind):
+        index.insert_nodes(nodes)
+        for page, node_ids in _nodes_by_page(nodes).items():
+            page_nodes.setdefault(page, []).extend(node_ids)
+        counts[kind] += len(nodes)
+        print(f"   🧠 Indexed {counts['text']} text + {counts['table']} table nodes", end="\r")
+
+    if detect_tables is not None:
+        print("🖼️  Detecting tables; each crop is summarised as soon as it is found...")
+    elif image_files:
+        print(f"🖼️  Found {len(image_files)} table images. Summarising in parallel with text embedding...")
+    else:
+        print("ℹ️  No table images found to process.")
+
+    # Enough threads for the adaptive limiter's ceiling; the limiter (shared
+    # with the embedder) decides how many VLM calls are actually in flight
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENCY) as executor:
+        batcher = _TableBatcher(lambda items: submitted.put(executor.submit(_table_nodes, items)))
+        for img in sorted(image_files, key=lambda path: (_table_page(path) or 0, path)):
+            batcher.add(img)
+        batcher.flush()
+
+        vision_thread = None
+        if detect_tables is not None:
+            def run_vision():
+                try:
+                    detect_tables(batcher.add)
+                except Exception as e:
+                    vision_errors.append(e)
+                finally:
+                    batcher.flush()
+
+            vision_thread = threading.Thread(target=run_vision, name="vision", daemon=True)
+            vision_thread.start()
+
+        pending = set()
+
+        def vision_running():
+            return vision_thread is not None and vision_thread.is_alive()
+
+        def collect(block):
+            while not submitted.empty():
+                pending.add(submitted.get_nowait())
+            if not pending:
+                if block and vision_running():
+                    try:
+                        pending.add(submitted.get(timeout=0.5))
+                    except queue.Empty:
+                        pass
+                return
+            done, _ = wait(pending, timeout=0.5 if block else 0, return_when=FIRST_COMPLETED)
+            pending.difference_update(done)
+            nodes = [node for future in done for node in future.result()]
+            if nodes:
+                insert(nodes, "table")
+
+        text_nodes = iter(text_nodes)
+        while True:
+            batch = list(islice(text_nodes, batch_size))
+            if not batch:
+                break
+            insert(batch, "text")
+            collect(block=False)
+        while vision_running() or pending or not submitted.empty():
+            collect(block=True)
+
+    if vision_errors:
+        raise vision_errors[0]
+    print(f"\n✅ Indexed {counts['text']} text + {counts['table']} table nodes.")
+    if counts["table"] or image_files or detect_tables is not None:
+        print(f"♻️  Summary cache: {summary_cache.hits} hits / {summary_cache.misses} misses")
+    return page_nodes, counts["text"], counts["table"]
+
+def _nodes_by_page(nodes):
+    page_nodes = {}
+    for node in nodes:
+        page = node.metadata.get("page_num")
+        if isinstance(page, int):
+            page_nodes.setdefault(page, []).append(node.node_id)
+    return page_nodes
+
+def _print_embedding_cache_stats():
+    if embed_model.cache is not None:
+        cache = embed_model.cache
+        print(f"♻️  Embedding cache: {cache.hits} hits / {cache.misses} misses ({cache.hit_rate:.0%} hit rate)")
+
+def build_pipeline(pdf_path, table_output_dir, persist_dir="./storage", vision=None):
+    """
+    Streams pages -> chunks -> embeddings into the index in bounded batches,
+    while table crops are summarised and embedded concurrently.
+
     Args:
         pdf_path (str): Path to the uploaded PDF.
         table_output_dir (str): Directory where extracted table images are located.
         persist_dir (str): Directory to save the vector index.
+        vision (VisionProcessor, optional): Detects tables during ingest, handing
+            each crop to summarisation as it is found. Without it, existing crops
+            in `table_output_dir` are used.
     """
     print(f"🚀 Starting RAG Ingestion Pipeline for: {pdf_path}")
 
-    # 1. Load & Chunk PDF Text
-    # ---------------------------
-    from llama_index.readers.file import PDFReader
-    
     if not os.path.exists(pdf_path):
         print(f"❌ PDF not found at {pdf_path}")
         return None
 
-    print(f"📄 Loading Text from PDF...")
-    
-    # Force PDF parsing
-    parser = PDFReader()
-    file_extractor = {".pdf": parser}
-    reader = SimpleDirectoryReader(input_files=[pdf_path], file_extractor=file_extractor)
-    
-    pdf_docs = reader.load_data()
-    
-    # Create Text Nodes (Chunks)
-    splitter = SentenceSplitter(chunk_size=1024, chunk_overlap=200)
-    text_nodes = splitter.get_nodes_from_documents(pdf_docs)
-    print(f"✅ Generated {len(text_nodes)} text nodes from PDF.")
+    # 1. Create an empty index (vectors are persisted as a memory-mappable float32 matrix)
+    # ---------------------------
+    storage_context = StorageContext.from_defaults(vector_store=MemmapVectorStore())
+    index = VectorStoreIndex(nodes=[], storage_context=storage_context)
 
-    # 2. Multimodal Table Processing (Parallelized)
+    # 2. Chunk & embed text while 3. tables are summarised & embedded
     # ---------------------------
-    image_files = glob.glob(os.path.join(table_output_dir, "*.png"))
-    table_nodes = []
-    
-    if image_files:
-        print(f"🖼️  Found {len(image_files)} table images. Starting Parallel VLM processing...")
-        
-        import concurrent.futures
-
-        # Helper for parallel execution
-        def process_image(img_path):
-            try:
-                summary = summarize_table_image(img_path)
-                return img_path, summary
-            except Exception as e:
-                print(f"Error processing {img_path}: {e}")
-                return img_path, None
-
-        # Run with ThreadPool
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_img = {executor.submit(process_image, img): img for img in image_files}
-            
-            for i, future in enumerate(concurrent.futures.as_completed(future_to_img)):
-                img_path, summary = future.result()
-                print(f"   [{i+1}/{len(image_files)}] Analyzed {os.path.basename(img_path)}", end="\r")
-                
-                if summary:
-                    node = TextNode(text=summary)
-                    node.metadata = {
-                        "image_path": img_path,
-                        "file_name": os.path.basename(img_path),
-                        "type": "table_image",
-                        "page_num": "unknown" 
-                    }
-                    table_nodes.append(node)
-
-        print(f"\n✅ Generated {len(table_nodes)} table nodes from images.")
+    if vision is not None:
+        vision.clear_output()
+        image_files = []
+        detect_tables = lambda on_table: vision.process_pdf(pdf_path, on_table=on_table)
     else:
-        print("ℹ️  No table images found to process.")
+        image_files = glob.glob(os.path.join(table_output_dir, "*.png"))
+        detect_tables = None
+    print(f"📄 Streaming text from PDF (batches of {INGEST_BATCH_SIZE} chunks)...")
+    page_nodes, _, _ = _run_ingest_dag(index, _iter_text_nodes(pdf_path), image_files, detect_tables)
+    _print_embedding_cache_stats()
 
-    # 3. Embed Everything & 4. Persist
-    # ---------------------------
-    all_nodes = text_nodes + table_nodes
-    print(f"🧠 Embedding {len(all_nodes)} total nodes ({len(text_nodes)} text + {len(table_nodes)} tables)...")
-    
-    # Create Index
-    index = VectorStoreIndex(
-        nodes=all_nodes, 
-        show_progress=True
-    )
-    
-    # Save to Disk
+    # 4. Save to Disk (plus the page manifest used by incremental updates)
     index.storage_context.persist(persist_dir=persist_dir)
+    save_manifest(persist_dir, pdf_path, fingerprint_pages(pdf_path), page_nodes)
     print(f"💾 Index persisted to {persist_dir}")
     print("🎉 Pipeline Finish!")
     return index
 
+def _page_labels(pdf_path):
+    """Printed page labels of the PDF, as _iter_page_documents records them."""
+    import pypdf
+
+    with open(pdf_path, "rb") as fp:
+        return list(pypdf.PdfReader(fp).page_labels)
+
+def _renumber_nodes(index, pdf_path, new_page_nodes):
+    """
+    Points the nodes of moved pages ({new page: node ids}) at their new page:
+    page_num/page_label for text, and the renamed crop for tables. Only the
+    docstore changes; embeddings are kept.
+    """
+    labels = _page_labels(pdf_path)
+    nodes = []
+    for page, node_ids in new_page_nodes.items():
+        for node in index.docstore.get_nodes(node_ids, raise_error=False):
+            node.metadata["page_num"] = page
+            if "image_path" in node.metadata:
+                match = CROP_PATTERN.match(os.path.basename(node.metadata["image_path"]))
+                if match:
+                    filename = f"p{page}_table_{match.group(2)}.png"
+                    node.metadata["image_path"] = os.path.join(os.path.dirname(node.metadata["image_path"]), filename)
+                    node.metadata["file_name"] = filename
+            elif "page_label" in node.metadata:
+                node.metadata["page_label"] = labels[page - 1]
+            nodes.append(node)
+    index.docstore.add_documents(nodes, allow_update=True)
+
+def update_pipeline(pdf_path, table_output_dir, persist_dir="./storage", vision=None):
+    """
+    Incremental ingest: fingerprints every page, diffs against the manifest of
+    the persisted index and only re-chunks, re-detects tables, re-summarises
+    and re-embeds added/changed pages, deleting nodes of changed/removed pages.
+    Pages are matched by fingerprint, so pages that only moved (e.g. after an
+    inserted page) keep their nodes and crops under the new page number.
+    Falls back to a full `build_pipeline` when there is no manifest yet.
+
+    Args:
+        pdf_path (str): Path to the (possibly amended) PDF.
+        table_output_dir (str): Directory holding the extracted table images.
+        persist_dir (str): Directory of the persisted vector index.
+        vision (VisionProcessor, optional): Used to re-detect tables on changed
+            pages. Without it, existing crops in `table_output_dir` are used.
+    """
+    if not os.path.exists(pdf_path):
+        print(f"❌ PDF not found at {pdf_path}")
+        return None
+
+    manifest = load_manifest(persist_dir)
+    if manifest is None:
+        print("ℹ️  No page manifest found. Running a full ingest...")
+        return build_pipeline(pdf_path, table_output_dir, persist_dir, vision=vision)
+
+    print(f"🔄 Starting Incremental Ingestion for: {pdf_path}")
+    fingerprints = fingerprint_pages(pdf_path)
+    added, changed, removed, moved = diff_pages(manifest, fingerprints)
+    print(f"🔍 Page delta: {len(added)} added, {len(changed)} changed, {len(removed)} removed, {len(moved)} moved")
+
+    index = load_index(persist_dir)
+    if not (added or changed or removed or moved):
+        print("✅ Index is already up to date.")
+        return index
+
+    # 1. Delete stale nodes (old page numbers), then renumber moved pages
+    # ---------------------------
+    old_page_nodes = {int(page): entry["node_ids"] for page, entry in manifest["pages"].items()}
+    stale_ids = [node_id for page in changed + removed for node_id in old_page_nodes.get(page, [])]
+    if stale_ids:
+        index.delete_nodes(stale_ids, delete_from_docstore=True)
+        print(f"🗑️  Deleted {len(stale_ids)} stale nodes.")
+    page_nodes = {}
+    for page, node_ids in old_page_nodes.items():
+        if page in moved:
+            page_nodes[moved[page]] = node_ids
+        elif page not in changed and page not in removed:
+            page_nodes[page] = node_ids
+    if vision is not None:
+        vision.remove_page_tables(removed)
+    if moved:
+        move_page_tables(vision.output_dir if vision is not None else table_output_dir, moved)
+        _renumber_nodes(index, pdf_path, {new: old_page_nodes[old] for old, new in moved.items()})
+        print(f"↪️  Renumbered {len(moved)} moved pages without re-embedding.")
+
+    # 2. Re-detect tables on dirty pages & 3. chunk, summarise & embed the delta
+    # ---------------------------
+    dirty = added + changed
+    image_files, detect_tables = [], None
+    if vision is not None:
+        if dirty:
+            detect_tables = lambda on_table: vision.process_pdf(pdf_path, pages=dirty, on_table=on_table)
+    else:
+        image_files = [
+            path for path in glob.glob(os.path.join(table_output_dir, "*.png"))
+            if _table_page(path) in dirty
+        ]
+
+    text_nodes = _iter_text_nodes(pdf_path, pages=dirty) if dirty else []
+    new_page_nodes, _, _ = _run_ingest_dag(index, text_nodes, image_files, detect_tables)
+    for page, node_ids in new_page_nodes.items():
+        page_nodes.setdefault(page, []).extend(node_ids)
+    _print_embedding_cache_stats()
+
+    # 4. Persist
+    # ---------------------------
+    index.storage_context.persist(persist_dir=persist_dir)
+    save_manifest(persist_dir, pdf_path, fingerprints, page_nodes)
+    print(f"💾 Index updated in {persist_dir}")
+    print("🎉 Incremental Update Finish!")
+    return index
+
 if __name__ == "__main__":
     # Default for CLI compatibility
     build_pipeline(
@@ -7,9 +7,193 @@ from llama_index.core.llms import (
 )
 from llama_index.core.embeddings import BaseEmbedding
 from llama_index.core.llms.callbacks import llm_completion_callback
-from llama_index.core.base.llms.types import ChatMessage, ChatResponse
-from openai import OpenAI
+from llama_index.core.base.llms.types import ChatMessage, ChatResponse, CompletionResponseAsyncGen
+from llama_index.core.utils import get_tokenizer
+from openai import OpenAI, AsyncOpenAI
+import httpx
+import importlib.util
 import os
+import asyncio
+import threading
+import weakref
+from pydantic import PrivateAttr
+try:
+    from src.rag.cache import EmbeddingCache, QueryEmbeddingCache
+    from src.rag.concurrency import AdaptiveLimiter
+except ImportError:
+    from cache import EmbeddingCache, QueryEmbeddingCache
+    from concurrency import AdaptiveLimiter
+
+# --- Connection Pool Configuration ---
+HTTP_MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("OPENROUTER_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2 needs the optional `h2` package (pip install "httpx[http2]")
+HTTP2 = os.getenv("OPENROUTER_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+# One OpenAI client (and therefore one warm httpx pool) per (base_url, api_key),
+# shared by the LLM, the embedder and the VLM table summariser.
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Adaptive (AIMD) concurrency limit per (base_url, api_key), shared by the
+# LLM/VLM calls and the embedder across threads and event loops.
+_limiters = {}
+
+# Async clients and concurrency limits are bound to an event loop, so they are
+# shared per (loop, base_url, api_key) between the LLM and the embedder.
+_async_resources = weakref.WeakKeyDictionary()
+_async_resources_lock = threading.Lock()
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+
+
+def get_client(base_url: str, api_key: str) -> OpenAI:
+    """Returns the lazily created, process-wide client for this endpoint."""
+    key = (base_url, api_key)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = OpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                http_client=httpx.Client(limits=_http_limits(), http2=HTTP2),
+            )
+        return _clients[key]
+
+
+def get_limiter(base_url: str, api_key: str, pool: str = "bulk") -> AdaptiveLimiter:
+    """
+    Returns the process-wide adaptive limiter for this endpoint and `pool`.
+    Ingest traffic (VLM summaries, chunk embeddings) shares the "bulk" pool;
+    query-time calls use their own pool so a running ingest, which keeps every
+    bulk slot busy, never queues an interactive question behind it.
+    """
+    key = (base_url, api_key, pool)
+    with _clients_lock:
+        if key not in _limiters:
+            _limiters[key] = AdaptiveLimiter()
+        return _limiters[key]
+
+
+def _get_async_resources(base_url: str, api_key: str, max_concurrency: int):
+    """Returns the shared (AsyncOpenAI, Semaphore) pair for the running event loop."""
+    loop = asyncio.get_running_loop()
+    with _async_resources_lock:
+        per_loop = _async_resources.setdefault(loop, {})
+        key = (base_url, api_key)
+        if key not in per_loop:
+            per_loop[key] = (
+                AsyncOpenAI(
+                    base_url=base_url,
+                    api_key=api_key,
+                    http_client=httpx.AsyncClient(limits=_http_limits(), http2=HTTP2),
+                ),
+                asyncio.Semaphore(max_concurrency),
+            )
+        return per_loop[key]
+
+
+def _normalize_text(text: str) -> str:
+    """The exact text sent to the embeddings API (and hashed for the cache)."""
+    return text.replace("\n", " ")
+
+
+def _to_openai_messages(messages: List[ChatMessage]) -> List[Dict[str, Any]]:
+    """Converts LlamaIndex ChatMessages to OpenAI dicts."""
+    openai_msgs = []
+    for m in messages:
+        content = m.content
+        # Handle vision blocks if present (simplified)
+        if hasattr(m, 'blocks') and m.blocks:
+            content_parts = []
+            for block in m.blocks:
+                if block.block_type == "text":
+                    content_parts.append({"type": "text", "text": block.text})
+                elif block.block_type == "image":
+                    # LlamaIndex stores images in various ways, usually url/path
+                    # We need to ensure it's a URL or base64 data URL. 
+                    # block.url is AnyUrl, must convert to string for JSON serialization.
+                    content_parts.append({
+                        "type": "image_url",
+                        "image_url": {"url": str(block.url)} 
+                    })
+            content = content_parts
+        
+        openai_msgs.append({"role": m.role.value, "content": content})
+    return openai_msgs
+
+
+def _chunk_delta(chunk) -> Optional[str]:
+    """Text delta of a streamed chat completion chunk (None for empty/usage chunks)."""
+    if not chunk.choices:
+        return None
+    return chunk.choices[0].delta.content or None
+
+
+class StreamingCompletion:
+    """
+    Iterates over the text deltas of a streamed chat completion.
+
+    Deltas are appended to a list buffer and `text` joins them on demand (and
+    caches the result), so consuming an answer is linear in its length instead
+    of re-materialising the full text for every chunk. Read `text` once at the
+    end; callers that need the running text per chunk should accumulate it
+    themselves (see `_responses`).
+    """
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._parts = []
+        self._text = None
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            delta = _chunk_delta(chunk)
+            if delta:
+                self._parts.append(delta)
+                self._text = None
+                yield delta
+
+    async def __aiter__(self):
+        # Same buffering for an async chunk stream (AsyncOpenAI)
+        async for chunk in self._chunks:
+            delta = _chunk_delta(chunk)
+            if delta:
+                self._parts.append(delta)
+                self._text = None
+                yield delta
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._parts)
+        return self._text
+
+
+def _responses(stream: StreamingCompletion):
+    """
+    CompletionResponses for LlamaIndex's stream_complete. Each one must carry
+    the cumulative text, so keep a running string (one copy per delta) rather
+    than re-joining the stream's whole buffer on every chunk.
+    """
+    text = ""
+    for delta in stream:
+        text += delta
+        yield CompletionResponse(text=text, delta=delta)
+
+
+async def _aresponses(stream: StreamingCompletion):
+    text = ""
+    async for delta in stream:
+        text += delta
+        yield CompletionResponse(text=text, delta=delta)
+
 
 class OpenRouterLLM(CustomLLM):
     """
@@ -19,9 +203,13 @@ class OpenRouterLLM(CustomLLM):
     api_key: str
     base_url: str = "https://openrouter.ai/api/v1"
     context_window: int = 128000
+    # Max in-flight async requests per event loop (shared with the embedder)
+    max_concurrency: int = 8
+    # Adaptive limiter pool (see get_limiter); query-time models use "interactive"
+    limiter_pool: str = "bulk"
     
-    def __init__(self, model: str, api_key: str):
-        super().__init__(model=model, api_key=api_key)
+    def __init__(self, model: str, api_key: str, **kwargs):
+        super().__init__(model=model, api_key=api_key, **kwargs)
         
     @property
     def metadata(self) -> LLMMetadata:
@@ -34,62 +222,94 @@ class OpenRouterLLM(CustomLLM):
 
     @property
     def _client(self) -> OpenAI:
-        return OpenAI(base_url=self.base_url, api_key=self.api_key)
+        return get_client(self.base_url, self.api_key)
+
+    @property
+    def _limiter(self) -> AdaptiveLimiter:
+        return get_limiter(self.base_url, self.api_key, self.limiter_pool)
 
     @llm_completion_callback()
     def complete(self, prompt: str, **kwargs: Any) -> CompletionResponse:
-        response = self._client.chat.completions.create(
+        # Retries happen in the limiter, so 429s are seen (and backed off) there
+        client = self._client.with_options(max_retries=0)
+        response = self._limiter.call(lambda: client.chat.completions.create(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             **kwargs
-        )
+        ), kind="chat")
         return CompletionResponse(text=response.choices[0].message.content)
 
-    @llm_completion_callback()
-    def stream_complete(self, prompt: str, **kwargs: Any) -> CompletionResponseGen:
-        # Simple streaming implementation
+    def stream_text(self, prompt: str, **kwargs: Any) -> "StreamingCompletion":
+        """Streams a completion as text deltas (see StreamingCompletion)."""
         response = self._client.chat.completions.create(
             model=self.model,
             messages=[{"role": "user", "content": prompt}],
             stream=True,
             **kwargs
         )
-        def gen():
-            text = ""
-            for chunk in response:
-                delta = chunk.choices[0].delta.content or ""
-                text += delta
-                yield CompletionResponse(text=text, delta=delta)
-        return gen()
+        return StreamingCompletion(response)
 
-    def chat(self, messages: List[ChatMessage], **kwargs: Any) -> ChatResponse:
-        # Convert LlamaIndex ChatMessages to OpenAI dicts
-        openai_msgs = []
-        for m in messages:
-            content = m.content
-            # Handle vision blocks if present (simplified)
-            if hasattr(m, 'blocks') and m.blocks:
-                content_parts = []
-                for block in m.blocks:
-                    if block.block_type == "text":
-                        content_parts.append({"type": "text", "text": block.text})
-                    elif block.block_type == "image":
-                        # LlamaIndex stores images in various ways, usually url/path
-                        # We need to ensure it's a URL or base64 data URL. 
-                        # block.url is AnyUrl, must convert to string for JSON serialization.
-                         content_parts.append({
-                            "type": "image_url",
-                            "image_url": {"url": str(block.url)} 
-                        })
-                content = content_parts
-            
-            openai_msgs.append({"role": m.role.value, "content": content})
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, **kwargs: Any) -> CompletionResponseGen:
+        # LlamaIndex expects the cumulative text on every CompletionResponse,
+        # which costs O(len(text)) per chunk. Callers that only need deltas
+        # should use stream_text(), which stays linear in the answer length.
+        return _responses(self.stream_text(prompt, **kwargs))
 
-        response = self._client.chat.completions.create(
+    def chat(self, messages: List[ChatMessage], **kwargs: Any) -> ChatResponse:
+        client = self._client.with_options(max_retries=0)
+        openai_messages = _to_openai_messages(messages)
+        response = self._limiter.call(lambda: client.chat.completions.create(
             model=self.model,
-            messages=openai_msgs,
+            messages=openai_messages,
             **kwargs
+        ), kind="chat")
+        return ChatResponse(
+            message=ChatMessage(
+                role="assistant", 
+                content=response.choices[0].message.content
+            )
         )
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, **kwargs: Any) -> CompletionResponse:
+        client, limit = _get_async_resources(self.base_url, self.api_key, self.max_concurrency)
+        client = client.with_options(max_retries=0)
+        async with limit:
+            response = await self._limiter.acall(lambda: client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                **kwargs
+            ), kind="chat")
+        return CompletionResponse(text=response.choices[0].message.content)
+
+    @llm_completion_callback()
+    async def astream_complete(self, prompt: str, **kwargs: Any) -> CompletionResponseAsyncGen:
+        client, limit = _get_async_resources(self.base_url, self.api_key, self.max_concurrency)
+
+        async def gen():
+            # Hold the concurrency slot for the lifetime of the stream
+            async with limit:
+                response = await client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    stream=True,
+                    **kwargs
+                )
+                async for completion in _aresponses(StreamingCompletion(response)):
+                    yield completion
+        return gen()
+
+    async def achat(self, messages: List[ChatMessage], **kwargs: Any) -> ChatResponse:
+        client, limit = _get_async_resources(self.base_url, self.api_key, self.max_concurrency)
+        client = client.with_options(max_retries=0)
+        openai_messages = _to_openai_messages(messages)
+        async with limit:
+            response = await self._limiter.acall(lambda: client.chat.completions.create(
+                model=self.model,
+                messages=openai_messages,
+                **kwargs
+            ), kind="chat")
         return ChatResponse(
             message=ChatMessage(
                 role="assistant", 
@@ -105,31 +325,145 @@ class OpenRouterEmbedding(BaseEmbedding):
     model_name: str = "openai/text-embedding-3-small"
     api_key: str
     base_url: str = "https://openrouter.ai/api/v1"
+    # Upper bound on (estimated) tokens packed into one embeddings request
+    max_batch_tokens: int = 250000
+    # Max in-flight async requests per event loop (shared with the LLM)
+    max_concurrency: int = 8
+    # Adaptive limiter pool (see get_limiter); query-time models use "interactive"
+    limiter_pool: str = "bulk"
+    # Optional on-disk cache for document embeddings (SQLite file path)
+    cache_path: Optional[str] = None
+    cache_max_entries: int = 200000
+    # In-memory LRU of query embeddings (0 disables it), optionally persisted
+    # to its own SQLite file. Shared by every caller of this embedder, e.g.
+    # all Streamlit sessions using the module-level model in query.py.
+    query_cache_size: int = 1024
+    query_cache_path: Optional[str] = None
+
+    _cache: Optional[EmbeddingCache] = PrivateAttr(default=None)
+    _query_cache: Optional[QueryEmbeddingCache] = PrivateAttr(default=None)
 
     def __init__(self, api_key: str, model_name: str = "openai/text-embedding-3-small", **kwargs):
+        # Many inputs per request; LlamaIndex slices batches by embed_batch_size
+        kwargs.setdefault("embed_batch_size", 100)
         super().__init__(model_name=model_name, api_key=api_key, **kwargs)
+        if self.cache_path:
+            self._cache = EmbeddingCache(self.cache_path, max_entries=self.cache_max_entries)
+        if self.query_cache_size > 0:
+            disk = EmbeddingCache(self.query_cache_path, max_entries=self.cache_max_entries) if self.query_cache_path else None
+            self._query_cache = QueryEmbeddingCache(self.query_cache_size, disk=disk)
+
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        return self._cache
+
+    @property
+    def query_cache(self) -> Optional[QueryEmbeddingCache]:
+        return self._query_cache
 
     @property
     def _client(self) -> OpenAI:
-        return OpenAI(base_url=self.base_url, api_key=self.api_key)
+        return get_client(self.base_url, self.api_key)
+
+    @property
+    def _limiter(self) -> AdaptiveLimiter:
+        return get_limiter(self.base_url, self.api_key, self.limiter_pool)
 
     def _get_query_embedding(self, query: str) -> List[float]:
-        return self._get_embedding(query)
+        if self._query_cache is None:
+            return self._get_embedding(query)
+        embedding = self._query_cache.get(self.model_name, query)
+        if embedding is None:
+            embedding = self._get_embedding(self._query_cache.normalize(query))
+            self._query_cache.set(self.model_name, query, embedding)
+        return embedding
 
     def _get_text_embedding(self, text: str) -> List[float]:
-        return self._get_embedding(text)
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        texts = [_normalize_text(text) for text in texts]
+        embeddings = self._cache_lookup(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            fresh = []
+            for batch in self._pack_batches([texts[i] for i in missing]):
+                fresh.extend(self._embed_batch(batch))
+            self._cache_fill(texts, embeddings, missing, fresh)
+        return embeddings
 
     def _get_embedding(self, text: str) -> List[float]:
-        text = text.replace("\n", " ")
-        response = self._client.embeddings.create(
+        return self._embed_batch([text])[0]
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        client = self._client.with_options(max_retries=0)
+        inputs = [_normalize_text(text) for text in texts]
+        response = self._limiter.call(lambda: client.embeddings.create(
             model=self.model_name,
-            input=[text],
+            input=inputs,
             encoding_format="float"
-        )
-        return response.data[0].embedding
+        ), kind="embeddings")
+        # Results carry their input position; don't rely on response ordering
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
+
+    def _pack_batches(self, texts: List[str]):
+        """Splits texts into request-sized batches by count and token budget."""
+        tokenizer = get_tokenizer()
+        batch, batch_tokens = [], 0
+        for text in texts:
+            tokens = len(tokenizer(text))
+            if batch and (len(batch) >= self.embed_batch_size or batch_tokens + tokens > self.max_batch_tokens):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def _cache_lookup(self, texts: List[str]) -> List[Optional[List[float]]]:
+        if self._cache is None:
+            return [None] * len(texts)
+        return self._cache.get_embeddings(self.model_name, texts)
+
+    def _cache_fill(self, texts, embeddings, missing, fresh) -> None:
+        for i, embedding in zip(missing, fresh):
+            embeddings[i] = embedding
+        if self._cache is not None:
+            self._cache.set_embeddings(self.model_name, [texts[i] for i in missing], fresh)
 
     async def _aget_query_embedding(self, query: str) -> List[float]:
-        return self._get_query_embedding(query)
+        if self._query_cache is None:
+            return (await self._aembed_batch([query]))[0]
+        embedding = self._query_cache.get(self.model_name, query)
+        if embedding is None:
+            embedding = (await self._aembed_batch([self._query_cache.normalize(query)]))[0]
+            self._query_cache.set(self.model_name, query, embedding)
+        return embedding
 
     async def _aget_text_embedding(self, text: str) -> List[float]:
-        return self._get_text_embedding(text)
+        return (await self._aget_text_embeddings([text]))[0]
+
+    async def _aget_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        texts = [_normalize_text(text) for text in texts]
+        embeddings = self._cache_lookup(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            # Batches run concurrently, bounded by the shared semaphore
+            results = await asyncio.gather(
+                *(self._aembed_batch(batch) for batch in self._pack_batches([texts[i] for i in missing]))
+            )
+            fresh = [embedding for batch in results for embedding in batch]
+            self._cache_fill(texts, embeddings, missing, fresh)
+        return embeddings
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        client, limit = _get_async_resources(self.base_url, self.api_key, self.max_concurrency)
+        client = client.with_options(max_retries=0)
+        inputs = [_normalize_text(text) for text in texts]
+        async with limit:
+            response = await self._limiter.acall(lambda: client.embeddings.create(
+                model=self.model_name,
+                input=inputs,
+                encoding_format="float"
+            ), kind="embeddings")
+        return [d.embedding for d in sorted(response.data, key=lambda d: d.index)]
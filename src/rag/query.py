@@ -2,14 +2,19 @@ import os
 from dotenv import load_dotenv
 from llama_index.core import (
     Settings,
-    StorageContext,
-    load_index_from_storage,
     VectorStoreIndex,
 )
+from llama_index.core.schema import QueryBundle
 try:
     from src.rag.openrouter_client import OpenRouterLLM, OpenRouterEmbedding
+    from src.rag.index_cache import index_cache, storage_fingerprint
+    from src.rag.retrieval import get_retriever
+    from src.rag.answer_cache import ANSWER_CACHE_ENABLED, answer_cache
 except ImportError:
     from openrouter_client import OpenRouterLLM, OpenRouterEmbedding
+    from index_cache import index_cache, storage_fingerprint
+    from retrieval import get_retriever
+    from answer_cache import ANSWER_CACHE_ENABLED, answer_cache
 
 # Load env variables
 load_dotenv()
@@ -17,41 +22,70 @@ load_dotenv()
 # --- Configuration ---
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
-# LLM (Retriever & Synthesizer)
+# LLM (Retriever & Synthesizer). Query-time calls get their own adaptive
+# limiter, so they don't wait behind a concurrent ingest's VLM/embedding calls.
 llm = OpenRouterLLM(
     model="openai/gpt-4o-mini",
     api_key=OPENROUTER_API_KEY,
+    limiter_pool="interactive",
 )
 
 # Embed Model (Must match ingest)
+# Query embeddings are cached in-process (shared by all sessions); set
+# QUERY_EMBEDDING_CACHE_PATH to also keep them on disk across restarts.
 embed_model = OpenRouterEmbedding(
     model_name="openai/text-embedding-3-small", 
     api_key=OPENROUTER_API_KEY,
+    query_cache_size=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024")),
+    query_cache_path=os.getenv("QUERY_EMBEDDING_CACHE_PATH") or None,
+    limiter_pool="interactive",
 )
 
 Settings.llm = llm
 Settings.embed_model = embed_model
 
-def query_system(user_query: str, persist_dir: str = "./storage") -> dict:
+STORAGE_NOT_FOUND = "Error: Storage not found. Run ingest.py first."
+
+def _has_storage(persist_dir: str) -> bool:
+    return os.path.exists(persist_dir) and bool(os.listdir(persist_dir))
+
+def _answer_key(persist_dir: str) -> tuple:
+    """Answer cache key: a re-ingest changes the fingerprint, so old answers stop matching."""
+    key = os.path.abspath(persist_dir)
+    return key, storage_fingerprint(key)
+
+def _cached_answer(user_query: str, persist_dir: str):
     """
-    Takes a user query, retrieves relevant context (text + table summaries),
-    and returns the answer along with source image paths.
+    Embeds the query once and looks it up in the answer cache.
+    Returns (query_embedding, answer_key, cached answer or None).
+    """
+    query_embedding = embed_model.get_query_embedding(user_query)
+    if not ANSWER_CACHE_ENABLED:
+        return query_embedding, None, None
+    key = _answer_key(persist_dir)
+    return query_embedding, key, answer_cache.lookup(key, user_query, query_embedding)
+
+def _build_prompt(user_query: str, persist_dir: str, query_embedding=None):
+    """
+    Retrieves context for the query and builds the synthesis prompt.
+    Returns (full_prompt, context_str, retrieved_images), or None if there is no index.
     """
     
-    # 1. Load the Index
-    if not os.path.exists(persist_dir) or not os.listdir(persist_dir):
-        return {"response": "Error: Storage not found. Run ingest.py first.", "images": []}
+    # 1. Load the Index (cached per storage fingerprint, so only the first query pays)
+    if not _has_storage(persist_dir):
+        return None
 
-    storage_context = StorageContext.from_defaults(persist_dir=persist_dir)
-    index = load_index_from_storage(storage_context)
+    index = index_cache.get(persist_dir)
     
     # 2. Retrieve Context
-    # We use the lower-level retriever to inspect nodes manually
-    retriever = index.as_retriever(similarity_top_k=15)
-    nodes = retriever.retrieve(user_query)
+    # We use the lower-level retriever to inspect nodes manually.
+    # NumpyRetriever does a single matrix-vector product over all embeddings.
+    retriever = get_retriever(index, similarity_top_k=15)
+    # (The embedding computed for the answer cache is reused here.)
+    nodes = retriever.retrieve(QueryBundle(query_str=user_query, embedding=query_embedding))
     
     # 3. Process Retrieved Nodes
-    context_str = ""
+    context_parts = []
     retrieved_images = []
     
     for node in nodes:
@@ -59,19 +93,20 @@ def query_system(user_query: str, persist_dir: str = "./storage") -> dict:
         page = node.metadata.get("page_label", "N/A")
         file_name = node.metadata.get("file_name", "N/A")
         
-        # Accumulate text with clear headers for the LLM
+        # Accumulate text with clear headers for the LLM (joined once below)
         if "image_path" in node.metadata:
-             context_str += f"\n--- Source: Table Image ({file_name}) ---\n{node.text}\n"
+             context_parts.append(f"\n--- Source: Table Image ({file_name}) ---\n{node.text}\n")
         else:
-             context_str += f"\n--- Source: Text (Page {page}) ---\n{node.text}\n"
+             context_parts.append(f"\n--- Source: Text (Page {page}) ---\n{node.text}\n")
         
         # Check for image metadata
         if "image_path" in node.metadata:
             img_path = node.metadata["image_path"]
             if img_path not in retrieved_images:
                 retrieved_images.append(img_path)
+    context_str = "".join(context_parts)
     
-    # 4. Synthesize Answer
+    # 4. Build the Synthesis Prompt
     system_prompt = (
         "You are a financial analyst assistant. "
         "Answer the user's question based ONLY on the context provided below. "
@@ -85,14 +120,74 @@ def query_system(user_query: str, persist_dir: str = "./storage") -> dict:
         f"User Question: {user_query}\n"
         "Answer:"
     )
+    return full_prompt, context_str, retrieved_images
+
+def query_system(user_query: str, persist_dir: str = "./storage") -> dict:
+    """
+    Takes a user query, retrieves relevant context (text + table summaries),
+    and returns the answer along with source image paths.
+    Near-duplicate questions against the same index are served from the answer cache.
+    """
+    if not _has_storage(persist_dir):
+        return {"response_text": STORAGE_NOT_FOUND, "source_images": []}
+    query_embedding, key, cached = _cached_answer(user_query, persist_dir)
+    if cached is not None:
+        return cached
+
+    prepared = _build_prompt(user_query, persist_dir, query_embedding)
+    if prepared is None:
+        return {"response_text": STORAGE_NOT_FOUND, "source_images": []}
+    full_prompt, context_str, retrieved_images = prepared
     
     response = llm.complete(full_prompt)
     
-    return {
+    result = {
         "response_text": response.text,
         "source_images": retrieved_images,
         "context_used": context_str # Optional: for debug
     }
+    if key is not None:
+        answer_cache.store(key, user_query, query_embedding, result)
+    return result
+
+def stream_query_system(user_query: str, persist_dir: str = "./storage") -> dict:
+    """
+    Streaming variant of `query_system`. Retrieval runs eagerly, so the sources
+    are available immediately; `response_gen` yields answer text deltas as the
+    LLM generates them. A cached answer is yielded as a single chunk; a fresh
+    one is added to the answer cache once the stream has been fully consumed.
+    """
+    if not _has_storage(persist_dir):
+        return {"response_gen": iter([STORAGE_NOT_FOUND]), "source_images": []}
+    query_embedding, key, cached = _cached_answer(user_query, persist_dir)
+    if cached is not None:
+        return {
+            "response_gen": iter([cached["response_text"]]),
+            "source_images": cached["source_images"],
+            "context_used": cached.get("context_used", ""),
+        }
+
+    prepared = _build_prompt(user_query, persist_dir, query_embedding)
+    if prepared is None:
+        return {"response_gen": iter([STORAGE_NOT_FOUND]), "source_images": []}
+    full_prompt, context_str, retrieved_images = prepared
+
+    stream = llm.stream_text(full_prompt)
+    def response_gen():
+        yield from stream
+        # Only complete answers are cached (not streams abandoned mid-way)
+        if key is not None:
+            answer_cache.store(key, user_query, query_embedding, {
+                "response_text": stream.text,
+                "source_images": retrieved_images,
+                "context_used": context_str,
+            })
+
+    return {
+        "response_gen": response_gen(),
+        "source_images": retrieved_images,
+        "context_used": context_str # Optional: for debug
+    }
 
 if __name__ == "__main__":
     # Test CLI
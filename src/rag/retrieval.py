@@ -0,0 +1,112 @@
+from typing import Any, List, Optional, Sequence, Tuple
+import numpy as np
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import NodeWithScore, QueryBundle
+
+
+def normalize_rows(matrix) -> np.ndarray:
+    """L2-normalises each row as float32, so cosine similarity becomes a dot product."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact top-k by dot product: one matrix-vector product, then `argpartition`
+    so only the k winners are sorted. Returns (row indices, scores), best first.
+    """
+    scores = matrix @ query
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    if k < scores.shape[0]:
+        rows = np.argpartition(-scores, k - 1)[:k]
+    else:
+        rows = np.arange(scores.shape[0])
+    rows = rows[np.argsort(-scores[rows])]
+    return rows, scores[rows]
+
+
+class MatrixSearchEngine:
+    """
+    All node embeddings as one pre-normalised float32 matrix, searched with
+    `top_k`. With an `ann` index (see ann.IVFIndex) built over the same rows,
+    unfiltered searches only scan the rows it selects.
+    """
+
+    def __init__(self, ids: Sequence[str], matrix: np.ndarray, normalized: bool = False, ann=None):
+        self.ids = list(ids)
+        self.matrix = matrix if normalized else normalize_rows(matrix)
+        self.ann = ann
+
+    @classmethod
+    def from_vector_store(cls, vector_store) -> "MatrixSearchEngine":
+        # MemmapVectorStore already keeps a normalised matrix (possibly memory-mapped)
+        if hasattr(vector_store, "matrix") and hasattr(vector_store, "node_ids"):
+            return cls(vector_store.node_ids, vector_store.matrix, normalized=True, ann=getattr(vector_store, "ann", None))
+        # SimpleVectorStore: convert the embedding_dict once
+        embedding_dict = vector_store.data.embedding_dict
+        ids = list(embedding_dict.keys())
+        if not ids:
+            return cls([], np.zeros((0, 0), dtype=np.float32), normalized=True)
+        return cls(ids, [embedding_dict[i] for i in ids])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query_embedding, k: int, node_ids: Optional[Sequence[str]] = None) -> Tuple[List[str], List[float]]:
+        if not self.ids:
+            return [], []
+        query = normalize_rows([query_embedding])[0]
+        if self.ann is not None and node_ids is None:
+            rows, scores = self.ann.search(self.matrix, query, k)
+            return [self.ids[i] for i in rows], scores.tolist()
+        matrix, ids = self.matrix, self.ids
+        if node_ids is not None:
+            allowed = set(node_ids)
+            subset = np.array([i for i, node_id in enumerate(ids) if node_id in allowed], dtype=np.int64)
+            matrix = matrix[subset]
+            ids = [ids[i] for i in subset]
+        rows, scores = top_k(matrix, query, k)
+        return [ids[i] for i in rows], scores.tolist()
+
+
+class NumpyRetriever(BaseRetriever):
+    """
+    Drop-in replacement for `index.as_retriever()` on a VectorStoreIndex that
+    searches a `MatrixSearchEngine` instead of the vector store's query path.
+    """
+
+    def __init__(self, index, engine: MatrixSearchEngine, similarity_top_k: int = 10, embed_model=None, **kwargs: Any):
+        self._index = index
+        self._engine = engine
+        self._similarity_top_k = similarity_top_k
+        self._embed_model = embed_model or index._embed_model
+        super().__init__(**kwargs)
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        if query_bundle.embedding is None:
+            query_bundle.embedding = self._embed_model.get_agg_embedding_from_queries(
+                query_bundle.embedding_strs
+            )
+        ids, scores = self._engine.search(query_bundle.embedding, self._similarity_top_k)
+        if not ids:
+            return []
+        nodes_dict = self._index.index_struct.nodes_dict
+        nodes = self._index.docstore.get_nodes([nodes_dict.get(i, i) for i in ids])
+        return [NodeWithScore(node=node, score=score) for node, score in zip(nodes, scores)]
+
+
+def get_retriever(index, similarity_top_k: int = 10) -> NumpyRetriever:
+    """
+    Returns a NumpyRetriever for `index`. The engine is built once per index
+    object (indexes are shared through the index cache), so legacy JSON stores
+    only pay the list -> matrix conversion on the first query.
+    """
+    engine = getattr(index, "_numpy_search_engine", None)
+    if engine is None:
+        engine = MatrixSearchEngine.from_vector_store(index.vector_store)
+        index._numpy_search_engine = engine
+    return NumpyRetriever(index, engine, similarity_top_k=similarity_top_k)
@@ -0,0 +1,235 @@
+import os
+import sys
+import json
+from typing import Any, List, Optional, Sequence
+import numpy as np
+from pydantic import PrivateAttr
+from llama_index.core import StorageContext
+from llama_index.core.schema import BaseNode
+from llama_index.core.vector_stores.types import (
+    BasePydanticVectorStore,
+    VectorStoreQuery,
+    VectorStoreQueryMode,
+    VectorStoreQueryResult,
+)
+try:
+    from src.rag.retrieval import MatrixSearchEngine, normalize_rows
+    from src.rag.ann import ANN_MIN_VECTORS, IVF_NLIST, VECTOR_INDEX, IVFIndex
+except ImportError:
+    from retrieval import MatrixSearchEngine, normalize_rows
+    from ann import ANN_MIN_VECTORS, IVF_NLIST, VECTOR_INDEX, IVFIndex
+
+# On-disk layout (per vector store namespace, next to docstore.json etc.):
+#   default__vectors.npy     float32 matrix, one L2-normalised row per node
+#   default__vector_ids.json {"ids": [...], "ref_doc_ids": [...]} in row order
+#   default__ivf.npz         optional IVF index over those rows (VECTOR_INDEX=ivf)
+DEFAULT_NAMESPACE = "default"
+VECTORS_FNAME = "vectors.npy"
+IDS_FNAME = "vector_ids.json"
+IVF_FNAME = "ivf.npz"
+LEGACY_FNAME = "vector_store.json"
+
+
+def _paths(persist_dir: str, namespace: str = DEFAULT_NAMESPACE):
+    return (
+        os.path.join(persist_dir, f"{namespace}__{VECTORS_FNAME}"),
+        os.path.join(persist_dir, f"{namespace}__{IDS_FNAME}"),
+    )
+
+
+def _ivf_path(persist_dir: str, namespace: str = DEFAULT_NAMESPACE) -> str:
+    return os.path.join(persist_dir, f"{namespace}__{IVF_FNAME}")
+
+
+class MemmapVectorStore(BasePydanticVectorStore):
+    """
+    Vector store persisted as a contiguous float32 matrix plus a node-id table.
+
+    On load the matrix is opened with `numpy.memmap` (via `np.load(mmap_mode="r")`),
+    so opening an index is near-instant and several processes serving the same
+    document share its pages through the OS cache. Rows are normalised on write,
+    so cosine similarity is a plain dot product.
+
+    With VECTOR_INDEX=ivf, persisting a store of at least ANN_MIN_VECTORS rows
+    also (re)builds an IVF index over them, which searches then use. Adding or
+    deleting vectors drops the index until the next persist.
+    """
+    stores_text: bool = False
+
+    _matrix: Optional[np.ndarray] = PrivateAttr(default=None)
+    _pending: List[np.ndarray] = PrivateAttr(default_factory=list)
+    _ids: List[str] = PrivateAttr(default_factory=list)
+    _ref_doc_ids: List[Optional[str]] = PrivateAttr(default_factory=list)
+    _ann: Optional[IVFIndex] = PrivateAttr(default=None)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "MemmapVectorStore"
+
+    @property
+    def client(self) -> Any:
+        return None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """All vectors as one (n, dim) float32 array, in `node_ids` order."""
+        if self._pending:
+            parts = ([self._matrix] if self._matrix is not None else []) + self._pending
+            self._matrix = np.concatenate(parts, axis=0)
+            self._pending = []
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+    @property
+    def node_ids(self) -> List[str]:
+        return self._ids
+
+    @property
+    def ann(self) -> Optional[IVFIndex]:
+        """The IVF index over `matrix`, or None when searches are exact."""
+        return self._ann
+
+    def add(self, nodes: Sequence[BaseNode], **add_kwargs: Any) -> List[str]:
+        if not nodes:
+            return []
+        vectors = normalize_rows([node.get_embedding() for node in nodes])
+        self._pending.append(vectors)
+        self._ann = None
+        for node in nodes:
+            self._ids.append(node.node_id)
+            self._ref_doc_ids.append(node.ref_doc_id)
+        return [node.node_id for node in nodes]
+
+    def delete(self, ref_doc_id: str, **delete_kwargs: Any) -> None:
+        self._keep_rows([r != ref_doc_id for r in self._ref_doc_ids])
+
+    def delete_nodes(self, node_ids: Optional[List[str]] = None, filters=None, **delete_kwargs: Any) -> None:
+        if filters is not None:
+            raise NotImplementedError("MemmapVectorStore does not store metadata filters.")
+        if node_ids is None:
+            return
+        drop = set(node_ids)
+        self._keep_rows([i not in drop for i in self._ids])
+
+    def clear(self) -> None:
+        self._matrix = None
+        self._pending = []
+        self._ids = []
+        self._ref_doc_ids = []
+        self._ann = None
+
+    def query(self, query: VectorStoreQuery, **kwargs: Any) -> VectorStoreQueryResult:
+        if query.filters is not None:
+            raise NotImplementedError("Metadata filters are not supported by MemmapVectorStore.")
+        if query.mode != VectorStoreQueryMode.DEFAULT:
+            raise NotImplementedError(f"Query mode {query.mode} is not supported by MemmapVectorStore.")
+
+        engine = MatrixSearchEngine(self._ids, self.matrix, normalized=True, ann=self._ann)
+        ids, similarities = engine.search(query.query_embedding, query.similarity_top_k, node_ids=query.node_ids)
+        return VectorStoreQueryResult(nodes=None, similarities=similarities, ids=ids)
+
+    def persist(self, persist_path: str, fs=None) -> None:
+        """
+        Called by StorageContext.persist with `<dir>/<namespace>__vector_store.json`;
+        writes the binary files into the same directory instead.
+        """
+        persist_dir = os.path.dirname(persist_path) or "."
+        namespace = os.path.basename(persist_path).split("__")[0] or DEFAULT_NAMESPACE
+        os.makedirs(persist_dir, exist_ok=True)
+        vectors_path, ids_path = _paths(persist_dir, namespace)
+
+        # Write to temp files and rename, so processes that still have the old
+        # file mapped keep a valid view of it.
+        tmp_vectors = vectors_path + ".tmp"
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        tmp_ids = ids_path + ".tmp"
+        with open(tmp_ids, "w") as f:
+            json.dump({"ids": self._ids, "ref_doc_ids": self._ref_doc_ids}, f)
+        os.replace(tmp_vectors, vectors_path)
+        os.replace(tmp_ids, ids_path)
+        self._persist_ann(_ivf_path(persist_dir, namespace))
+
+    def _persist_ann(self, ivf_path: str) -> None:
+        if VECTOR_INDEX != "ivf" or len(self._ids) < ANN_MIN_VECTORS:
+            self._ann = None
+            if os.path.exists(ivf_path):
+                os.remove(ivf_path)
+            return
+        if self._ann is None:
+            print(f"🧭 Building IVF index over {len(self._ids)} vectors...")
+            self._ann = IVFIndex.build(self.matrix, nlist=IVF_NLIST or None)
+        self._ann.save(ivf_path)
+
+    @classmethod
+    def from_persist_dir(cls, persist_dir: str, namespace: str = DEFAULT_NAMESPACE) -> "MemmapVectorStore":
+        vectors_path, ids_path = _paths(persist_dir, namespace)
+        store = cls()
+        with open(ids_path) as f:
+            table = json.load(f)
+        store._ids = table["ids"]
+        store._ref_doc_ids = table["ref_doc_ids"]
+        if store._ids:
+            store._matrix = np.load(vectors_path, mmap_mode="r")
+            ivf_path = _ivf_path(persist_dir, namespace)
+            # VECTOR_INDEX=exact ignores an index on disk (e.g. to check recall)
+            if VECTOR_INDEX == "ivf" and os.path.exists(ivf_path):
+                ann = IVFIndex.load(ivf_path)
+                # Ignore an index left over from a different set of vectors
+                if ann.n_rows == len(store._ids):
+                    store._ann = ann
+        return store
+
+    @classmethod
+    def exists(cls, persist_dir: str, namespace: str = DEFAULT_NAMESPACE) -> bool:
+        return all(os.path.exists(p) for p in _paths(persist_dir, namespace))
+
+    def _keep_rows(self, keep: List[bool]) -> None:
+        if all(keep):
+            return
+        mask = np.array(keep, dtype=bool)
+        self._ann = None
+        # Fancy indexing copies, so a read-only memmap becomes an in-memory array
+        self._matrix = self.matrix[mask] if len(self._ids) else None
+        self._ids = [i for i, k in zip(self._ids, keep) if k]
+        self._ref_doc_ids = [r for r, k in zip(self._ref_doc_ids, keep) if k]
+
+
+def load_storage_context(persist_dir: str) -> StorageContext:
+    """Opens a persisted storage dir, using the memory-mapped vectors when present."""
+    if MemmapVectorStore.exists(persist_dir):
+        return StorageContext.from_defaults(
+            persist_dir=persist_dir,
+            vector_store=MemmapVectorStore.from_persist_dir(persist_dir),
+        )
+    return StorageContext.from_defaults(persist_dir=persist_dir)
+
+
+def convert_storage(persist_dir: str, namespace: str = DEFAULT_NAMESPACE) -> int:
+    """
+    Converts a legacy `<namespace>__vector_store.json` (JSON embedding_dict)
+    into the binary format and removes the JSON file. Returns the node count.
+    """
+    legacy_path = os.path.join(persist_dir, f"{namespace}__{LEGACY_FNAME}")
+    with open(legacy_path) as f:
+        data = json.load(f)
+
+    embedding_dict = data.get("embedding_dict", {})
+    ref_docs = data.get("text_id_to_ref_doc_id", {})
+
+    store = MemmapVectorStore()
+    store._ids = list(embedding_dict.keys())
+    store._ref_doc_ids = [ref_docs.get(i) for i in store._ids]
+    if store._ids:
+        store._matrix = normalize_rows([embedding_dict[i] for i in store._ids])
+    store.persist(legacy_path)
+    os.remove(legacy_path)
+    return len(store._ids)
+
+
+if __name__ == "__main__":
+    # Usage: python src/rag/vector_store.py [persist_dir ...]
+    for target in sys.argv[1:] or ["./storage"]:
+        count = convert_storage(target)
+        print(f"✅ Converted {count} vectors in {target}")
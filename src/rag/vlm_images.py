@@ -0,0 +1,56 @@
+import io
+import os
+import base64
+from typing import Tuple
+from PIL import Image
+
+# --- VLM Image Configuration ---
+# OpenAI-style high-detail vision fits images into 2048x2048 and then scales
+# the shortest side down to 768 before tiling; pixels beyond that are only
+# upload cost. Override for models with other limits.
+VLM_MAX_SIDE = int(os.getenv("VLM_IMAGE_MAX_SIDE", "2048"))
+VLM_MAX_SHORT_SIDE = int(os.getenv("VLM_IMAGE_MAX_SHORT_SIDE", "768"))
+# png (lossless, default), jpeg or webp
+VLM_IMAGE_FORMAT = os.getenv("VLM_IMAGE_FORMAT", "png").lower()
+VLM_IMAGE_QUALITY = int(os.getenv("VLM_IMAGE_QUALITY", "90"))
+
+_MIME_TYPES = {"png": "image/png", "jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def vlm_scale(width: int, height: int) -> float:
+    """Downscale factor (<= 1) that the VLM would apply anyway."""
+    return min(1.0, VLM_MAX_SIDE / max(width, height), VLM_MAX_SHORT_SIDE / min(width, height))
+
+
+def prepare_image(image_bytes: bytes) -> Tuple[bytes, str]:
+    """
+    Re-encodes a PNG crop for upload: downscaled to the VLM's working size and
+    converted to VLM_IMAGE_FORMAT. Returns (bytes, mime type); crops that need
+    neither step are returned untouched, without decoding, and so is any crop
+    the re-encode would make larger (antialiased text can compress worse).
+    """
+    fmt = VLM_IMAGE_FORMAT if VLM_IMAGE_FORMAT in _MIME_TYPES else "png"
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        scale = vlm_scale(*img.size)
+        if scale >= 1.0 and fmt == "png" and img.format == "PNG":
+            return image_bytes, _MIME_TYPES["png"]
+
+        img = img.convert("RGB")
+        if scale < 1.0:
+            size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+            img = img.resize(size, Image.LANCZOS)
+
+        out = io.BytesIO()
+        if fmt == "png":
+            img.save(out, format="PNG", optimize=False)
+        else:
+            img.save(out, format=fmt.upper(), quality=VLM_IMAGE_QUALITY)
+    if out.tell() >= len(image_bytes):
+        return image_bytes, _MIME_TYPES["png"]
+    return out.getvalue(), _MIME_TYPES[fmt]
+
+
+def to_data_url(image_bytes: bytes) -> str:
+    """Prepared image as a base64 data URL for the chat API."""
+    data, mime = prepare_image(image_bytes)
+    return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
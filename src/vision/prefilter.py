@@ -0,0 +1,77 @@
+"""
+Cheap table prefilter built on PyMuPDF's text and drawing structures.
+
+Scores a page from its text layer alone, so narrative pages can skip the
+render + YOLO stages. Signals:
+  - column rows: text lines split by a wide horizontal gap (label | value)
+  - numeric columns: 3+ numbers sharing a right edge (right-aligned figures)
+  - rule lines: horizontal/vertical strokes, as drawn by table grids
+  - find_tables(): PyMuPDF's own detector (opt-in, it is ~100x slower)
+Pages without a text layer (scans) always score as candidates.
+"""
+import re
+from collections import Counter, defaultdict
+
+# Matches 1,234  (1,234)  $12.5  -3  45%
+NUMERIC_TOKEN = re.compile(r"^[\(\$]?-?\$?[\d,]*\d(\.\d+)?%?\)?$")
+
+# Layout tolerances in PDF points
+ROW_TOLERANCE = 3.0
+COLUMN_GAP = 20.0
+COLUMN_TOLERANCE = 4.0
+RULE_THICKNESS = 3.0
+
+# Pages scoring below this skip detection (see benchmarks/bench_prefilter.py)
+DEFAULT_THRESHOLD = 5.0
+
+
+def _column_rows(words):
+    """Counts text rows containing at least one wide horizontal gap."""
+    rows = defaultdict(list)
+    for x0, _, x1, y1, *_ in words:
+        rows[round(y1 / ROW_TOLERANCE)].append((x0, x1))
+    count = 0
+    for spans in rows.values():
+        spans.sort()
+        if any(nxt[0] - cur[1] > COLUMN_GAP for cur, nxt in zip(spans, spans[1:])):
+            count += 1
+    return count
+
+
+def _numeric_columns(words):
+    """Counts right-aligned clusters of at least three numeric tokens."""
+    edges = Counter(
+        round(w[2] / COLUMN_TOLERANCE) for w in words if NUMERIC_TOKEN.match(w[4])
+    )
+    return sum(1 for n in edges.values() if n >= 3)
+
+
+def _rule_lines(page):
+    """Counts horizontal/vertical line segments and hairline rectangles."""
+    count = 0
+    for path in page.get_drawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                a, b = item[1], item[2]
+                if abs(a.y - b.y) < 1 or abs(a.x - b.x) < 1:
+                    count += 1
+            elif item[0] == "re":
+                rect = item[1]
+                if rect.height < RULE_THICKNESS or rect.width < RULE_THICKNESS:
+                    count += 1
+    return count
+
+
+def score_page(page, use_find_tables=False):
+    """
+    Returns a table-likelihood score for a fitz page. Higher means more
+    table-like; compare against DEFAULT_THRESHOLD (or a tuned value).
+    """
+    words = page.get_text("words")
+    if not words:
+        return float("inf")
+
+    score = _column_rows(words) + 2 * _numeric_columns(words) + 0.25 * _rule_lines(page)
+    if use_find_tables:
+        score += 10 * len(page.find_tables().tables)
+    return score
@@ -0,0 +1,91 @@
+"""
+Page rendering for VisionProcessor's worker processes.
+
+Kept free of ultralytics/torch imports so spawned workers start quickly.
+Each worker opens its own fitz document once (PyMuPDF documents cannot be
+shared across processes) and renders the pages it is handed. The module
+global is only for those spawned workers; in-process callers pass their
+own document as `doc`, so concurrent callers never share one.
+
+Pages are rendered twice at different resolutions: a small raster sized to
+the detector's input, then only the detected table regions at crop DPI.
+"""
+import fitz  # PyMuPDF
+import numpy as np
+try:
+    from src.vision.prefilter import score_page
+except ImportError:
+    from prefilter import score_page
+
+_doc = None
+
+
+def init_worker(pdf_path):
+    global _doc
+    _doc = fitz.open(pdf_path)
+
+
+def close_worker():
+    global _doc
+    if _doc is not None:
+        _doc.close()
+        _doc = None
+
+
+def render_page(page_index, max_side=640, min_score=None, in_process=False, doc=None):
+    """
+    Renders one page to RGB so its longer side is `max_side` pixels.
+    Returns (page_index, zoom, width, height, samples), or None when
+    `min_score` is set and the page's prefilter score is below it.
+
+    `samples` is the Pixmap itself when `in_process` (so page_array can wrap
+    its buffer), otherwise the samples bytes for pickling back to the parent.
+    `doc` defaults to the worker's document (see init_worker).
+    """
+    page = (doc if doc is not None else _doc)[page_index]
+    if min_score is not None and score_page(page) < min_score:
+        return None
+    zoom = max_side / max(page.rect.width, page.rect.height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    return page_index, zoom, pix.width, pix.height, pix if in_process else pix.samples
+
+
+class _PixmapBuffer:
+    """Exposes a Pixmap's samples to NumPy; arrays keep it (and the buffer) alive."""
+
+    def __init__(self, pix):
+        self.pix = pix
+        self.__array_interface__ = {
+            "shape": (pix.height, pix.width, pix.n),
+            "typestr": "|u1",
+            "data": (pix.samples_ptr, True),
+            "strides": (pix.stride, pix.n, 1),
+            "version": 3,
+        }
+
+
+def page_array(width, height, samples):
+    """
+    Wraps rendered RGB samples (bytes or a Pixmap) as a read-only HxWx3 BGR
+    view without copying. Ultralytics treats ndarrays as BGR and flips them
+    back while building its input tensor, so that is the only copy made.
+    """
+    if isinstance(samples, fitz.Pixmap):
+        rgb = np.asarray(_PixmapBuffer(samples))
+    else:
+        rgb = np.frombuffer(samples, dtype=np.uint8).reshape(height, width, 3)
+    return rgb[..., ::-1]
+
+
+def render_crops(page_index, boxes, box_zoom, zoom=2.0, doc=None):
+    """
+    Re-renders detected regions at `zoom` and returns them as PNG bytes.
+    `boxes` are (x1, y1, x2, y2) pixels from a render at `box_zoom`.
+    """
+    page = (doc if doc is not None else _doc)[page_index]
+    crops = []
+    for box in boxes:
+        clip = fitz.Rect(box) / box_zoom
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip)
+        crops.append(pix.tobytes("png"))
+    return crops